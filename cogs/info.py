@@ -1,10 +1,15 @@
+import asyncio
 import json
 import logging
+import time
 import urllib.parse
+from collections import Counter, OrderedDict, namedtuple
+from pathlib import Path
 
-from aiohttp import ClientSession
+from aiohttp import ClientError
 
-from discord.ext.commands import Cog, Context, command
+from discord.ext.commands import Cog, Context, command, is_owner
+from pymongo.errors import PyMongoError
 
 from wetbot.bot import Wetbot
 
@@ -15,113 +20,395 @@ WIKIPEDIA_URL = 'https://en.wikipedia.org/w/api.php'
 UD_URL = 'http://api.urbandictionary.com/v0/define?term={}'
 OXFORD_URL = 'https://od-api.oxforddictionaries.com/api/v1'
 
+NOTHING = r"I got nothin ¯\_(ツ)_/¯"
+
+# How long a lookup stays cached, by endpoint, unless the config says
+# otherwise. Lookups that found nothing only stay for NEGATIVE_TTL.
+CACHE_TTLS = {
+    'wikipedia': 6 * 60 * 60,
+    'urbandictionary': 60 * 60,
+    'oxford': 7 * 24 * 60 * 60,
+}
+NEGATIVE_TTL = 10 * 60
+
+# How old stored definitions can get before we ask for them again.
+DEFINITION_REFRESH = 30 * 24 * 60 * 60
+
+MESSAGE_LIMIT = 2000
+
+# Links asked for on a disambiguation page. More than enough to fill
+# up a message with titles.
+WIKI_LINKS = 100
+
+DISAMBIGUATION_TEMPLATE = "try something like... ```{titles}```"
+
 DEF_TEMPLATE = (
     '```\n{word}{domains}\n/{pronunciation}/, '
     '{category}\n{definition}```'
 )
 
+Definition = namedtuple(
+    'Definition', 'word domains pronunciation category definition')
+
 
 def json_format(response):
     return '```json\n{}```'.format(
         json.dumps(response, indent='  '))
 
 
+def normalize(query):
+    return ' '.join(query.lower().split())
+
+
+class ResponseCache(object):
+    """recent lookups, so the popular ones don't hit the network
+
+    every endpoint gets its own ttl, and once there's more than
+    maxsize entries the least recently used ones get tossed"""
+
+    def __init__(self, ttls, negative_ttl=NEGATIVE_TTL, maxsize=1024):
+        self.ttls = ttls
+        self.negative_ttl = negative_ttl
+        self.maxsize = maxsize
+        self.hits = Counter()
+        self.misses = Counter()
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, endpoint, key):
+        entry = self._entries.get((endpoint, key))
+        if entry is not None:
+            expires, value = entry
+            if expires > time.monotonic():
+                self._entries.move_to_end((endpoint, key))
+                self.hits[endpoint] += 1
+                return value
+            del self._entries[(endpoint, key)]
+        self.misses[endpoint] += 1
+        return None
+
+    def put(self, endpoint, key, value, negative=False):
+        ttl = self.negative_ttl if negative else self.ttls[endpoint]
+        self._entries[(endpoint, key)] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end((endpoint, key))
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class DefinitionCursors(object):
+    """how far each channel has cycled through its last definitions
+
+    channels that go quiet for idle seconds get forgotten, and so do
+    the least recently used ones past maxsize"""
+
+    def __init__(self, maxsize=1000, idle=60 * 60):
+        self.maxsize = maxsize
+        self.idle = idle
+        # channel id -> [definitions, index of the next one, last used]
+        self._cursors = OrderedDict()
+
+    def __len__(self):
+        return len(self._cursors)
+
+    def _expire(self, now):
+        # Least recently used is at the front, so that's where anything
+        # that's gone idle is too.
+        while self._cursors:
+            channel_id, (_, _, used) = next(iter(self._cursors.items()))
+            if now - used < self.idle:
+                break
+            del self._cursors[channel_id]
+
+    def start(self, channel_id, definitions):
+        now = time.monotonic()
+        self._expire(now)
+        self._cursors[channel_id] = [definitions, 0, now]
+        self._cursors.move_to_end(channel_id)
+        while len(self._cursors) > self.maxsize:
+            self._cursors.popitem(last=False)
+
+    def next(self, channel_id):
+        """the channel's next definition, or None once it's run out
+
+        raises KeyError if the channel hasn't got any definitions"""
+        now = time.monotonic()
+        self._expire(now)
+        cursor = self._cursors[channel_id]
+        definitions, index, _ = cursor
+        if index >= len(definitions):
+            del self._cursors[channel_id]
+            return None
+        cursor[1:] = index + 1, now
+        self._cursors.move_to_end(channel_id)
+        return definitions[index]
+
+
+class MongoDefinitionBackend(object):
+    def __init__(self, db):
+        self.db = db
+
+    async def get(self, kind, key):
+        doc = await self.db[kind].find_one({'_id': key})
+        if doc is None:
+            return None
+        return (doc['value'], doc['fetched_at'])
+
+    async def put(self, kind, key, value):
+        await self.db[kind].replace_one(
+            {'_id': key},
+            {'value': value, 'fetched_at': time.time()},
+            upsert=True)
+
+    async def flush(self):
+        pass
+
+
+class FileDefinitionBackend(object):
+    """the same thing in a json file, for running without mongo
+
+    only the maxsize most recently fetched entries of each kind are
+    kept, and the file gets written out off the event loop on flush"""
+
+    def __init__(self, loop, filepath, maxsize=5000):
+        self.loop = loop
+        self.maxsize = maxsize
+        self._filepath = Path(filepath)
+        self._data = {}
+        self._write_lock = asyncio.Lock()
+        try:
+            with self._filepath.open(mode='r') as store_file:
+                self._data = json.load(store_file)
+        except FileNotFoundError:
+            log.info(f"no definition store at '{self._filepath}' yet")
+        except json.decoder.JSONDecodeError:
+            log.exception("unable to load definition store from file:")
+
+    async def get(self, kind, key):
+        entry = self._data.get(kind, {}).get(key)
+        return None if entry is None else tuple(entry)
+
+    async def put(self, kind, key, value):
+        entries = self._data.setdefault(kind, {})
+        entries.pop(key, None)
+        entries[key] = [value, time.time()]
+        # Entries go in as they're fetched, so the oldest come first.
+        for old_key in list(entries)[:max(len(entries) - self.maxsize, 0)]:
+            del entries[old_key]
+
+    async def flush(self):
+        # Copy the dicts here, the executor can't be reading them while
+        # they're being changed. Entries get replaced, never changed in
+        # place, so a shallow copy will do.
+        data = {kind: dict(entries) for kind, entries in self._data.items()}
+        async with self._write_lock:
+            await self.loop.run_in_executor(None, self._write, data)
+
+    def _write(self, data):
+        temp_path = self._filepath.with_suffix('.tmp')
+        with temp_path.open(mode='w') as store_file:
+            json.dump(data, store_file)
+        temp_path.replace(self._filepath)
+
+
+class DefinitionStore(object):
+    """query -> word id -> definitions, kept across restarts
+
+    anything fetched more than refresh seconds ago is stale, which
+    means it gets fetched again, but still beats nothing if that fails"""
+
+    def __init__(self, backend, refresh=DEFINITION_REFRESH):
+        self.backend = backend
+        self.refresh = refresh
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+
+    async def _get(self, kind, key):
+        try:
+            return await self.backend.get(kind, key)
+        except PyMongoError:
+            log.exception(f"couldn't read {kind} entry {key!r}")
+            return None
+
+    async def find(self, query):
+        """(word id, definitions, fresh) for a query, or None"""
+        entry = await self._get('queries', query)
+        if entry is not None:
+            word_id, queried = entry
+            word = await self._get('words', word_id)
+            if word is not None:
+                definitions, fetched = word
+                fresh = time.time() - min(queried, fetched) < self.refresh
+                if fresh:
+                    self.hits += 1
+                else:
+                    self.stale += 1
+                return (word_id,
+                        tuple(Definition(*row) for row in definitions),
+                        fresh)
+        self.misses += 1
+        return None
+
+    async def word(self, word_id):
+        """fresh definitions for a word id, or None"""
+        entry = await self._get('words', word_id)
+        if entry is None or time.time() - entry[1] >= self.refresh:
+            return None
+        return tuple(Definition(*row) for row in entry[0])
+
+    async def save(self, query, word_id, definitions=None):
+        try:
+            if definitions is not None:
+                await self.backend.put(
+                    'words', word_id, [list(row) for row in definitions])
+            await self.backend.put('queries', query, word_id)
+            await self.backend.flush()
+        except (PyMongoError, OSError):
+            log.exception(f"couldn't store definitions for {query!r}")
+
+
 class InfoCog(Cog):
     def __init__(self, bot: Wetbot):
         self.bot = bot
-        self.session = ClientSession(loop=bot.loop)
-        self.active_definitions = {}
+        self.active_definitions = DefinitionCursors(
+            maxsize=bot.config.get('info', 'definition_channels', 1000),
+            idle=bot.config.get('info', 'definition_idle', 60 * 60))
+        self.cache = ResponseCache(
+            {endpoint: bot.config.get('info', f'{endpoint}_ttl', ttl)
+             for endpoint, ttl in CACHE_TTLS.items()},
+            negative_ttl=bot.config.get('info', 'negative_ttl', NEGATIVE_TTL),
+            maxsize=bot.config.get('info', 'cache_size', 1024))
+        store = bot.config.get('info', 'definition_store', 'mongo')
+        self.dictionary = DefinitionStore(
+            MongoDefinitionBackend(bot.db.info)
+            if store == 'mongo'
+            else FileDefinitionBackend(
+                bot.loop,
+                store,
+                maxsize=bot.config.get('info', 'definition_store_size', 5000)),
+            refresh=bot.config.get(
+                'info', 'definition_refresh', DEFINITION_REFRESH))
+        # (endpoint, normalized query) -> the lookup everyone asking for
+        # that is waiting on
+        self._in_flight = {}
 
     def __unload(self):
-        self.bot.loop.create_task(self.session.close())
-
-    async def _wiki_get_pageid(self, query: str):
-        query = urllib.parse.quote_plus(query)
+        for task in self._in_flight.values():
+            task.cancel()
+
+    async def lookup(self, endpoint: str, query: str, fetch):
+        """(result, error) for a query, out of the cache if possible
+
+        fetch does the actual lookup on a miss. results get cached, and
+        so does coming up with nothing, but other errors don't"""
+        key = normalize(query)
+        cached = self.cache.get(endpoint, key)
+        if cached is not None:
+            return cached
+
+        # Anyone asking the same thing while it's being looked up waits
+        # on the same task, rather than asking again themselves.
+        task = self._in_flight.get((endpoint, key))
+        if task is None:
+            task = self._in_flight[(endpoint, key)] = (
+                self.bot.loop.create_task(
+                    self._fetch(endpoint, key, query, fetch)))
+            task.add_done_callback(
+                lambda task: self._landed(endpoint, key, task))
+        # Shielded, so one caller giving up doesn't cancel it for the
+        # rest of them.
+        return await asyncio.shield(task)
+
+    async def _fetch(self, endpoint, key, query, fetch):
+        result, error = await fetch(query)
+        if result is not None:
+            self.cache.put(endpoint, key, (result, None))
+        elif error == NOTHING:
+            self.cache.put(endpoint, key, (None, error), negative=True)
+        return result, error
+
+    def _landed(self, endpoint, key, task):
+        if self._in_flight.get((endpoint, key)) is task:
+            del self._in_flight[(endpoint, key)]
+
+    async def _wiki_fetch(self, query: str, suggested: bool = False):
+        # Searching through the generator gets us the top result's url
+        # and whether it's a disambiguation page in the same request.
         query_string = ('?action=query'
-                        '&list=search'
-                        '&format=json'
-                        '&srsearch={}'
-                        '&srinfo=suggestion'
-                        '&srprop=redirecttitle')
-
-        async with self.session.get(
-            WIKIPEDIA_URL + query_string.format(query),
+                        '&generator=search'
+                        '&gsrsearch={}'
+                        '&gsrlimit=1'
+                        '&gsrinfo=suggestion'
+                        '&gsrenablerewrites=1'
+                        '&prop=info|pageprops'
+                        '&ppprop=disambiguation'
+                        '&inprop=url'
+                        '&format=json')
+
+        async with self.bot.web.get(
+            WIKIPEDIA_URL + query_string.format(
+                urllib.parse.quote_plus(query)),
             timeout=5
         ) as resp:
-            if resp.status == 200:
-                response = await resp.json()
-                log.debug(f"wikipedia search response: {response}")
-                results = response.get('query')
-                if results:
-                    if results['search']:
-                        return (str(results['search'][0]['pageid']), None)
-                    else:
-                        try:
-                            return await self._wiki_get_pageid(
-                                results['searchinfo']['suggestion'])
-                        except KeyError:
-                            return (
-                                None,
-                                r"I got nothin ¯\_(ツ)_/¯")
-                else:
-                    return (
-                        None,
-                        json_format(response))
-
-    @command(aliases=('wiki', 'w'))
-    async def wikipedia(self, ctx: Context, *, query: str):
-        """search all the knowledge"""
-        pageid, error = await self._wiki_get_pageid(query)
-
-        if pageid is None:
-            await ctx.send(error)
-            return
-
+            response = await resp.json()
+            log.debug(f"wikipedia search response: {response}")
+            if resp.status != 200 or 'error' in response:
+                return (None, json_format(response))
+
+        results = response.get('query', {})
+        if not results.get('pages'):
+            suggestion = results.get('searchinfo', {}).get('suggestion')
+            if suggestion and not suggested:
+                return await self._wiki_fetch(suggestion, suggested=True)
+            return (None, NOTHING)
+
+        page = next(iter(results['pages'].values()))
+        if 'disambiguation' not in page.get('pageprops', {}):
+            return (page['canonicalurl'], None)
+        return await self._wiki_disambiguation(page['pageid'])
+
+    async def _wiki_disambiguation(self, pageid: int):
+        # Only articles, and only about as many as fit in one message.
         query_string = ('?action=query'
-                        '&prop=info|pageprops|links'
-                        '&pllimit=max'
+                        '&prop=links'
+                        '&plnamespace=0'
+                        '&pllimit={}'
                         '&format=json'
-                        '&pageids={}'
-                        '&inprop=url')
+                        '&pageids={}')
 
-        async with self.session.get(
-            WIKIPEDIA_URL + query_string.format(pageid),
+        async with self.bot.web.get(
+            WIKIPEDIA_URL + query_string.format(WIKI_LINKS, pageid),
             timeout=5
         ) as resp:
-            if resp.status == 200:
-                response = await resp.json()
-                results = response.get('query')
-                log.debug(f"wikipedia info response: {results}")
-                if results:
-                    page = results['pages'][pageid]
-                    if 'disambiguation' not in page['pageprops']:
-                        out = results['pages'][pageid]['canonicalurl']
-                    else:
-                        out = "try something like... ```{titles}```".format(
-                            titles=', '.join(
-                                (link['title']
-                                 if ',' not in link['title']
-                                 else '"{}"'.format(link['title']))
-                                for link in page['links']
-                                if not any(
-                                    link['title'].startswith(s)
-                                    for s in (
-                                        'Talk:',
-                                        'Help:',
-                                        'Wikipedia:'
-                                    )
-                                )
-                            )
-                        )
-                else:
-                    out = json_format(response)
+            response = await resp.json()
+            log.debug(f"wikipedia links response: {response}")
+            if resp.status != 200 or 'error' in response:
+                return (None, json_format(response))
+
+        page = response['query']['pages'][str(pageid)]
+        room = MESSAGE_LIMIT - len(DISAMBIGUATION_TEMPLATE.format(titles=''))
+        titles = []
+        for link in page.get('links', ()):
+            title = (link['title']
+                     if ',' not in link['title']
+                     else '"{}"'.format(link['title']))
+            room -= len(title) + (2 if titles else 0)
+            if room < 0:
+                break
+            titles.append(title)
+        return (DISAMBIGUATION_TEMPLATE.format(titles=', '.join(titles)),
+                None)
 
-        await ctx.send(out)
+    @command(aliases=('wiki', 'w'))
+    async def wikipedia(self, ctx: Context, *, query: str):
+        """search all the knowledge"""
+        out, error = await self.lookup('wikipedia', query, self._wiki_fetch)
+        await ctx.send(out or error)
 
-    @command(aliases=('ud',))
-    async def urbandictionary(self, ctx: Context, *, query: str):
-        """search all the OTHER knowledge"""
-        async with self.session.get(
+    async def _ud_fetch(self, query: str):
+        async with self.bot.web.get(
             UD_URL.format(urllib.parse.quote(query)),
             timeout=5
         ) as resp:
@@ -129,16 +416,24 @@ class InfoCog(Cog):
                 response = await resp.json()
                 results = response.get('list')
                 if results:
-                    out = ('http://urbandictionary.com/define.php?term=' +
-                           urllib.parse.quote(results[0]['word']))
-                elif results is not None or response.get('result_type') == 'no_results':
-                    out = r"I got nothin ¯\_(ツ)_/¯"
+                    return (
+                        'http://urbandictionary.com/define.php?term=' +
+                        urllib.parse.quote(results[0]['word']),
+                        None)
+                elif (results is not None
+                      or response.get('result_type') == 'no_results'):
+                    return (None, NOTHING)
                 else:
-                    out = json_format(response)
+                    return (None, json_format(response))
             else:
-                out = json_format(response)
+                return (None, json_format(response))
 
-        await ctx.send(out)
+    @command(aliases=('ud',))
+    async def urbandictionary(self, ctx: Context, *, query: str):
+        """search all the OTHER knowledge"""
+        out, error = await self.lookup(
+            'urbandictionary', query, self._ud_fetch)
+        await ctx.send(out or error)
 
     domain_str = lambda self, domains: ' ({})'.format(', '.join(domains))
     def iterate_definitions(self, response: dict):  # noqa: E301
@@ -203,72 +498,119 @@ class InfoCog(Cog):
                                 return_dict['definition'] = definition
                                 yield return_dict
 
-    @command(aliases=('d',))
-    async def define(self, ctx: Context, *, query: str = None):
-        """mommy fixed it
-
-        after requesting a definition, use the command with no query
-        in the same channel to cycle through additional meanings"""
-        if not query:
-            try:
-                if ctx.channel.id in self.active_definitions:
-                    await ctx.send(DEF_TEMPLATE.format(
-                        **next(self.active_definitions[
-                            ctx.channel.id
-                        ])))
-                    return
-                else:
-                    await ctx.send("no active definitions!")
-            except StopIteration:
-                await ctx.send("ran outta definitions, friend")
-                del self.active_definitions[ctx.channel.id]
-                return
+    async def _oxford_fetch(self, query: str):
+        key = normalize(query)
+        stored = await self.dictionary.find(key)
+        if stored is not None and stored[2]:
+            return (stored[1], None)
 
+        try:
+            definitions, error = await self._oxford_request(query, key)
+        except (ClientError, asyncio.TimeoutError):
+            if stored is None:
+                raise
+            log.warning(f"couldn't refresh definitions for {key!r}, "
+                        "making do with the old ones")
+            return (stored[1], None)
+        if definitions is None and stored is not None and error != NOTHING:
+            # Old definitions are better than an error message.
+            return (stored[1], None)
+        return (definitions, error)
+
+    async def _oxford_request(self, query: str, key: str):
         app_id = self.bot.config.get('oxford_dictionaries', 'app_id', '')
         app_key = self.bot.config.get('oxford_dictionaries', 'app_key', '')
         if not app_id or not app_key:
-            await ctx.send("configuration incomplete")
-            return
+            return (None, "configuration incomplete")
         headers = {
             'app_id': app_id,
             'app_key': app_key
         }
 
-        word_id = None
-        async with self.session.get(
+        async with self.bot.web.get(
             OXFORD_URL + '/search/en?q=' + urllib.parse.quote(query),
             headers=headers,
             timeout=5
         ) as resp:
+            response = await resp.json()
             if resp.status == 200:
-                response = await resp.json()
                 if response['metadata']['total'] > 0:
                     word_id = response['results'][0]['id']
                 else:
-                    await ctx.send(r"I got nothin ¯\_(ツ)_/¯")
-                    return
+                    return (None, NOTHING)
+            else:
+                return (None, json_format(response))
+
+        # Somebody might've already looked this word up another way.
+        definitions = await self.dictionary.word(word_id)
+        if definitions is not None:
+            await self.dictionary.save(key, word_id)
+            return (definitions, None)
 
-        async with self.session.get(
+        async with self.bot.web.get(
             OXFORD_URL + '/entries/en/' + word_id,
             headers=headers,
             timeout=5
         ) as resp:
             if resp.status == 200:
                 result = (await resp.json())['results'][0]
+                # Only the bits we print get kept around.
+                definitions = tuple(
+                    Definition(**definition)
+                    for definition in self.iterate_definitions(result))
+                await self.dictionary.save(key, word_id, definitions)
+                return (definitions, None)
             else:
-                await ctx.send(json_format(await resp.json()))
+                return (None, json_format(await resp.json()))
+
+    @command(aliases=('d',))
+    async def define(self, ctx: Context, *, query: str = None):
+        """mommy fixed it
+
+        after requesting a definition, use the command with no query
+        in the same channel to cycle through additional meanings"""
+        if not query:
+            try:
+                definition = self.active_definitions.next(ctx.channel.id)
+            except KeyError:
+                await ctx.send("no active definitions!")
                 return
+            if definition is None:
+                await ctx.send("ran outta definitions, friend")
+            else:
+                await ctx.send(DEF_TEMPLATE.format(**definition._asdict()))
+            return
 
-        self.active_definitions[ctx.channel.id] = (
-            self.iterate_definitions(result)
-        )
+        definitions, error = await self.lookup(
+            'oxford', query, self._oxford_fetch)
+        if definitions is None:
+            await ctx.send(error)
+            return
 
-        try:
-            await ctx.send(DEF_TEMPLATE.format(
-                **next(self.active_definitions[ctx.channel.id])
-            ))
-        except StopIteration:
+        self.active_definitions.start(ctx.channel.id, definitions)
+        definition = self.active_definitions.next(ctx.channel.id)
+        if definition is None:
             await ctx.send("there is not even *one* of that thing")
+        else:
+            await ctx.send(DEF_TEMPLATE.format(**definition._asdict()))
+
+    @command(hidden=True)
+    @is_owner()
+    async def infocache(self, ctx: Context):
+        """how much typing we've saved the internet"""
+        lines = []
+        for endpoint in CACHE_TTLS:
+            hits = self.cache.hits[endpoint]
+            total = hits + self.cache.misses[endpoint]
+            rate = hits / total * 100 if total else 0
+            lines.append(f'{endpoint}: {hits}/{total} hits ({rate:.1f}%)')
+        lines.append(f'{len(self.cache)} lookups cached')
+        hits = self.dictionary.hits
+        total = hits + self.dictionary.stale + self.dictionary.misses
+        rate = hits / total * 100 if total else 0
+        lines.append(f'dictionary: {hits}/{total} hits ({rate:.1f}%), '
+                     f'{self.dictionary.stale} stale')
+        await ctx.send('```{}```'.format('\n'.join(lines)))
 
 
 def setup(bot: Wetbot):
@@ -36,6 +36,22 @@ class OwnerCog(Cog):
         await ctx.send('```{}```'.format(
             '\n'.join(sorted(self.bot.extensions.keys()))))
 
+    @command(hidden=True)
+    @is_owner()
+    async def latency(self, ctx: Context):
+        """who's keeping us waiting"""
+        hosts = sorted(
+            self.bot.web.latency.items(),
+            key=lambda item: item[1][1] / item[1][0],
+            reverse=True)
+        if not hosts:
+            await ctx.send("haven't asked anyone anything yet")
+            return
+        await ctx.send('```{}```'.format('\n'.join(
+            f'{host}: {total / requests * 1000:.0f}ms avg, '
+            f'{worst * 1000:.0f}ms worst ({requests} requests)'
+            for host, (requests, total, worst) in hosts)))
+
     @command(hidden=True)
     @is_owner()
     async def reload(self, ctx: Context, extension_name: str):
@@ -1,68 +1,619 @@
-import copy
+import asyncio
 import logging
+import multiprocessing
 import random
 import re
+import time
+from collections import OrderedDict
 
 import discord
 from discord.ext import commands
+from pymongo.errors import OperationFailure
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
+# collections under the spost database, in the order they're loaded
+KINDS = ('generic', 'embed', 'pattern')
 
-class SPostCog(commands.Cog):
-    wang = re.compile(
-        (r'(\b|_)'
-         r'('
-         r'([bh]?w)h?[aeo]+[ym]?n+g(e?[ziufdry]?|ing|um)?s?'
-         r'(\s*'
-         r'([bh]?w)h?[aeo]+[ym]?n+g(e?[ziufdry]?|ing|um)?s?'
-         r')*'
-         r')'
-         r'(\b|_)'
-         ),
-        re.IGNORECASE
-    )
+# characters that IGNORECASE will match against non-ASCII lookalikes
+# (ı, ſ, K), which str.lower() on the message won't fold back for us
+UNFOLDABLE = frozenset('iks')
+
+REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+
+# seconds a single search can take before it gets logged
+SLOW_SEARCH = 0.005
+
+
+def _walk(parsed):
+    for op, av in parsed:
+        yield op, av
+        for item in (av if isinstance(av, (tuple, list)) else (av,)):
+            if isinstance(item, sre_parse.SubPattern):
+                yield from _walk(item)
+            elif isinstance(item, list):
+                for sub in item:
+                    if isinstance(sub, sre_parse.SubPattern):
+                        yield from _walk(sub)
+
+
+def nested_quantifier(parsed):
+    """whether an unbounded repeat sits inside another unbounded repeat
+
+    stuff like ``(a+)*`` is what blows up into catastrophic
+    backtracking, so anything that trips this doesn't get loaded"""
+    for op, av in _walk(parsed):
+        if op in REPEATS and av[1] == sre_parse.MAXREPEAT:
+            for inner_op, inner_av in _walk(av[2]):
+                if (inner_op in REPEATS
+                        and inner_av[1] == sre_parse.MAXREPEAT):
+                    return True
+    return False
+
+
+def _literal(parsed, ignorecase):
+    """longest run of plain characters every match has to contain"""
+    best = run = ''
+    for op, av in parsed:
+        char = chr(av) if op is sre_parse.LITERAL else None
+        if char and ignorecase:
+            if ord(char) > 127 or char.lower() in UNFOLDABLE:
+                char = None
+            else:
+                char = char.lower()
+        if char:
+            run += char
+        else:
+            run = ''
+        if len(run) > len(best):
+            best = run
+    return best
+
+
+# A single wang. Its suffix can only be read one way, and it can't end
+# on a letter another wang starts with, so a run of them only splits
+# up one way too. Runs get strung together in find_wang rather than
+# with a repeat in here, which would leave unbounded repeats nested.
+WANG = (r'[bh]?wh?[aeo]+[ym]?n+g'
+        r'(?:ing|um|e[ziufdry]?|[ziufdry])?s?')
+WANG_START = re.compile(r'(?:\b|_)(' + WANG + ')', re.IGNORECASE)
+WANG_NEXT = re.compile(r'\s*' + WANG, re.IGNORECASE)
+WANG_END = re.compile(r'\b|_')
+
+assert not any(
+    nested_quantifier(sre_parse.parse(expression.pattern, expression.flags))
+    for expression in (WANG_START, WANG_NEXT))
+
+
+def find_wang(text):
+    """the first run of wangs in text, in linear time"""
+    pos = 0
+    while True:
+        start = WANG_START.search(text, pos)
+        if start is None:
+            return None
+        ends = [start.end()]
+        while True:
+            wang = WANG_NEXT.match(text, ends[-1])
+            if wang is None:
+                break
+            ends.append(wang.end())
+        # The longest run that ends on a word boundary wins.
+        for end in reversed(ends):
+            if WANG_END.match(text, end):
+                return text[start.start(1):end]
+        # The only other places a run could start in here are the
+        # wangs after the first, and their ends just failed too.
+        pos = ends[-1]
+
+
+class PatternMatcher(object):
+    """finds every pattern name matching a message in a single scan
+
+    patterns are merged into one alternation of named groups, so a
+    message that triggers nothing costs one pass no matter how many
+    patterns there are. anything the alternation shadows is confirmed
+    individually, but only if its required literal is in the message.
+    patterns with backreferences, named groups or global inline flags
+    can't be merged safely and are always searched on their own"""
+
+    def __init__(self, patterns=(), timings=None):
+        self.patterns = OrderedDict(patterns)
+        self.timings = {} if timings is None else timings
+        self.rebuild()
 
+    @staticmethod
+    def _mergeable(expression):
+        if expression.groupindex:
+            return None
+        # global inline flags like (?i) only work at the very start
+        if re.compile(expression.pattern).flags != re.compile('').flags:
+            return None
+        if expression.flags & ~(re.IGNORECASE | re.UNICODE):
+            return None
+        parsed = sre_parse.parse(expression.pattern, expression.flags)
+        for op, av in _walk(parsed):
+            if op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+                return None
+        return parsed
+
+    def rebuild(self):
+        self._groups = {}
+        self._literals = {}
+        self._standalone = []
+        alternatives = []
+        for name, expression in self.patterns.items():
+            parsed = self._mergeable(expression)
+            if parsed is None:
+                self._standalone.append(name)
+                continue
+            ignorecase = bool(expression.flags & re.IGNORECASE)
+            group = f'_{len(alternatives)}'
+            self._groups[group] = name
+            self._literals[name] = _literal(parsed, ignorecase)
+            alternatives.append('(?P<{}>(?{}:{}))'.format(
+                group,
+                'i' if ignorecase else '-i',
+                expression.pattern))
+        self._combined = (
+            re.compile('|'.join(alternatives)) if alternatives else None)
+
+    def __getstate__(self):
+        # Worker processes get a copy without everybody else's timings.
+        # Theirs come back separately, for merge_timings.
+        state = self.__dict__.copy()
+        state['timings'] = {}
+        return state
+
+    def merge_timings(self, timings):
+        for name, (count, total, worst) in timings.items():
+            old_count, old_total, old_worst = self.timings.get(
+                name, (0, 0.0, 0.0))
+            self.timings[name] = (
+                old_count + count, old_total + total, max(old_worst, worst))
+
+    def _record(self, name, elapsed, length):
+        count, total, worst = self.timings.get(name, (0, 0.0, 0.0))
+        self.timings[name] = (count + 1, total + elapsed, max(worst, elapsed))
+        if elapsed > SLOW_SEARCH:
+            log.warning(f"pattern '{name}' took {elapsed * 1000:.1f}ms "
+                        f"on a {length} character message")
+
+    def search(self, text):
+        """names of all patterns that match text, in insertion order"""
+        found = set()
+        if self._combined is not None:
+            start = time.perf_counter()
+            for match in self._combined.finditer(text):
+                found.add(self._groups[match.lastgroup])
+            self._record(
+                '(combined)', time.perf_counter() - start, len(text))
+
+        lowered = None
+        matched = []
+        for name, expression in self.patterns.items():
+            if name not in found:
+                if name in self._literals:
+                    # the alternation missed everything, so nothing
+                    # merged can match
+                    if not found:
+                        continue
+                    literal = self._literals[name]
+                    if expression.flags & re.IGNORECASE:
+                        if lowered is None:
+                            lowered = text.lower()
+                        if literal not in lowered:
+                            continue
+                    elif literal not in text:
+                        continue
+                start = time.perf_counter()
+                match = expression.search(text)
+                self._record(name, time.perf_counter() - start, len(text))
+                if not match:
+                    continue
+            matched.append(name)
+        return matched
+
+
+class PatternIndex(object):
+    """a matcher per set of patterns that can fire together somewhere
+
+    patterns carry optional ``guilds`` and ``channels`` id lists, and
+    unscoped patterns apply everywhere. guilds and channels without
+    patterns of their own all share the matcher for the unscoped ones,
+    and anywhere else that ends up with the same patterns shares too.
+    matchers get built the first time they're needed, and a change
+    only throws away the matchers it could have affected"""
+
+    def __init__(self):
+        self.expressions = OrderedDict()
+        self.scopes = {}
+        self.timings = {}
+        # (guild id, channel id) -> names of the patterns that apply
+        self._names = {}
+        # names of patterns -> the matcher for exactly those
+        self._matchers = {}
+        self._guilds = set()
+        self._channels = set()
+        self._dirty = []
+
+    def __len__(self):
+        return len(self.expressions)
+
+    def __contains__(self, name):
+        return name in self.expressions
+
+    def add(self, name, expression, guilds=None, channels=None):
+        self.remove(name)
+        scope = (frozenset(guilds or ()), frozenset(channels or ()))
+        self.expressions[name] = expression
+        self.scopes[name] = scope
+        self._dirty.append((name, scope))
+
+    def remove(self, name):
+        if self.expressions.pop(name, None) is not None:
+            self._dirty.append((name, self.scopes.pop(name)))
+
+    def rebuild(self):
+        """drop every cached matcher touched since the last rebuild"""
+        if not self._dirty:
+            return
+        self._guilds = set().union(
+            *(guilds for guilds, _ in self.scopes.values()))
+        self._channels = set().union(
+            *(channels for _, channels in self.scopes.values()))
+        guilds, channels = set(), set()
+        for _, (scoped_guilds, scoped_channels) in self._dirty:
+            if not scoped_guilds and not scoped_channels:
+                # unscoped, it could be anywhere
+                self._names.clear()
+                break
+            guilds |= scoped_guilds
+            channels |= scoped_channels
+        else:
+            for key in [key for key in self._names
+                        if key[0] in guilds or key[1] in channels]:
+                del self._names[key]
+        changed = {name for name, _ in self._dirty}
+        in_use = set(self._names.values())
+        self._matchers = {
+            names: matcher for names, matcher in self._matchers.items()
+            if names in in_use and changed.isdisjoint(names)}
+        self._dirty = []
+
+    def _applies(self, name, guild_id, channel_id):
+        guilds, channels = self.scopes[name]
+        if not guilds and not channels:
+            return True
+        return guild_id in guilds or channel_id in channels
+
+    def matcher(self, guild_id, channel_id):
+        if guild_id not in self._guilds:
+            guild_id = None
+        if channel_id not in self._channels:
+            channel_id = None
+        key = (guild_id, channel_id)
+        names = self._names.get(key)
+        if names is None:
+            names = self._names[key] = tuple(
+                name for name in self.expressions
+                if self._applies(name, guild_id, channel_id))
+        matcher = self._matchers.get(names)
+        if matcher is None:
+            matcher = self._matchers[names] = PatternMatcher(
+                ((name, self.expressions[name]) for name in names),
+                self.timings)
+        return matcher
+
+    def search(self, text, guild_id=None, channel_id=None):
+        return self.matcher(guild_id, channel_id).search(text)
+
+
+class SPostCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = bot.db.spost
+        self.patterns = PatternIndex()
+        self.pattern_commands = {}
+        self._names = {kind: {} for kind in KINDS}
+        # The commands defined right here in the class, then every
+        # command built from a document, by name.
+        self._static_commands = self.__cog_commands__
+        self._dynamic_commands = OrderedDict()
+        # Every name and alias this cog answers to.
+        self._taken = {
+            name: command
+            for command in self._static_commands
+            for name in (command.name, *command.aliases)}
+        self._synced = dict.fromkeys(KINDS)
+        self._listener = None
+        self._live = False
+        self._sync_task = None
+        self._worker = None
+        self._worker_lock = asyncio.Lock()
+
+    def __unload(self):
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+        if self._worker is not None:
+            self.bot.loop.run_in_executor(None, _kill, self._worker)
+        if self._listener is not None:
+            self.bot.remove_listener(self._listener, 'on_message')
 
     async def _init(self):
-        async for generic in self.db.generic.find():
-            self.add_generic(generic)
-
-        async for embed in self.db.embed.find():
-            self.add_embed(embed)
-
-        self.patterns = {}
-        async for pattern in self.db.pattern.find():
-            if pattern.get('distribute'):
-                pattern['pattern'] = r'(_|\W)*'.join(
-                    c for c in pattern['pattern'])
-            if pattern.get('case_sensitive'):
-                expression = re.compile(pattern['pattern'])
-            else:
-                expression = re.compile(pattern['pattern'], re.IGNORECASE)
-            self.patterns[pattern['name']] = re.compile(expression)
-            self.add_pattern(pattern)
+        for kind in KINDS:
+            async for doc in self.db[kind].find():
+                self.try_apply(kind, doc)
+                self._seen(kind, doc)
+        self.patterns.rebuild()
+        self._update_cog_commands()
 
         async def on_message(message):
             if message.author.id == self.bot.user.id:
                 return
-            match = self.wang.search(message.content)
-            if match:
+            wang, names = await self.scan(message)
+            if wang:
                 ctx = await self.bot.get_context(message)
-                await ctx.send(match.group(2))
-            for name, pattern in self.patterns.items():
-                match = pattern.search(message.content)
-                if match:
-                    message = copy.copy(message)
-                    message.content = self.bot.command_prefix + name
-                    await self.bot.process_commands(message)
+                await ctx.send(wang)
+            for name in names:
+                await self.dispatch_pattern(name, message)
 
+        self._listener = on_message
         self.bot.add_listener(on_message)
 
+    async def scan(self, message):
+        """run wang and every pattern scoped here against a message
+
+        long messages go off to a worker process with a time budget.
+        re holds the GIL the whole time it's matching, so a thread
+        wouldn't save the event loop, but a process can be killed.
+        they go one at a time, so the budget is only spent scanning"""
+        guild = message.guild
+        matcher = self.patterns.matcher(
+            guild.id if guild is not None else None,
+            message.channel.id)
+        text = message.content
+        if len(text) <= self.bot.config.get('spost', 'long_message', 1000):
+            return _scan(matcher, text)
+
+        budget = self.bot.config.get('spost', 'scan_budget', 0.5)
+        async with self._worker_lock:
+            if self._worker is None:
+                self._worker = multiprocessing.Pool(1)
+            worker = self._worker
+            result = worker.apply_async(_scan_worker, (matcher, text))
+            try:
+                found, timings = await self.bot.loop.run_in_executor(
+                    None, result.get, budget)
+            except multiprocessing.TimeoutError:
+                log.warning(f"gave up scanning a {len(text)} character "
+                            f"message in {message.channel} after {budget}s")
+                matcher.merge_timings({'(gave up)': (1, budget, budget)})
+                self._worker = None
+                await self.bot.loop.run_in_executor(None, _kill, worker)
+                return None, []
+        matcher.merge_timings(timings)
+        return found
+
+    def start_sync(self):
+        """commands register straight onto the bot from here on out"""
+        self._live = True
+        self._sync_task = self.bot.loop.create_task(self.sync())
+        self._sync_task.add_done_callback(self._sync_done)
+
+    def _sync_done(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            log.error("spost sync stopped", exc_info=task.exception())
+
+    async def sync(self):
+        """keep commands in step with the database, one doc at a time
+
+        uses change streams when mongo's running as a replica set and
+        falls back to polling for documents with a newer ``updated_at``
+        otherwise. polling can't see deletions, so set ``deleted`` on
+        a document rather than removing it outright"""
+        mode = self.bot.config.get('spost', 'sync', 'watch')
+        if mode == 'watch':
+            watchers = asyncio.gather(
+                *(self._watch(kind) for kind in KINDS))
+            try:
+                await watchers
+                return
+            except OperationFailure as error:
+                watchers.cancel()
+                log.info(f"change streams unavailable ({error}), "
+                         "falling back to polling")
+        elif mode != 'poll':
+            return
+        await self._poll()
+
+    async def _watch(self, kind):
+        stream = self.db[kind].watch(full_document='updateLookup')
+        try:
+            async for change in stream:
+                if change['operationType'] == 'delete':
+                    self.drop(kind, change['documentKey']['_id'])
+                elif change.get('fullDocument'):
+                    self.try_apply(kind, change['fullDocument'])
+                else:
+                    continue
+                if kind == 'pattern':
+                    self.patterns.rebuild()
+        finally:
+            await stream.close()
+
+    async def _poll(self):
+        interval = self.bot.config.get('spost', 'poll_interval', 60)
+        for kind in KINDS:
+            await self.db[kind].create_index('updated_at')
+        while True:
+            await asyncio.sleep(interval)
+            for kind in KINDS:
+                if self._synced[kind] is None:
+                    query = {'updated_at': {'$exists': True}}
+                else:
+                    query = {'updated_at': {'$gt': self._synced[kind]}}
+                changed = False
+                async for doc in self.db[kind].find(query).sort('updated_at'):
+                    # A doc that fails still counts as seen, it'd only
+                    # fail again next time.
+                    self.try_apply(kind, doc)
+                    self._seen(kind, doc)
+                    changed = True
+                if changed:
+                    log.info(f"synced spost.{kind} up to "
+                             f"{self._synced[kind]}")
+                    if kind == 'pattern':
+                        self.patterns.rebuild()
+
+    def _seen(self, kind, doc):
+        updated_at = doc.get('updated_at')
+        if updated_at is not None and (
+                self._synced[kind] is None
+                or updated_at > self._synced[kind]):
+            self._synced[kind] = updated_at
+
+    def apply(self, kind, doc):
+        """add or replace the command for a single document
+
+        the new command gets built and checked before the old one goes,
+        so a bad document leaves whatever was there before working.
+        pattern changes leave the index to be rebuilt by the caller,
+        so a batch of them only pays for one recompile"""
+        if doc.get('deleted'):
+            self.drop(kind, doc['_id'])
+            return
+        if kind == 'pattern':
+            command, expression = self.build_pattern(doc)
+        else:
+            command = getattr(self, 'build_' + kind)(doc)
+
+        replacing = self._names[kind].get(doc['_id'])
+        for name in (command.name, *command.aliases):
+            other = self._taken.get(name) or self.bot.all_commands.get(name)
+            if other is not None and other.name != replacing:
+                raise discord.ClientException(
+                    f"'{name}' is already taken by '{other.name}'")
+
+        self.drop(kind, doc['_id'])
+        self._register(command)
+        self._names[kind][doc['_id']] = doc['name']
+        if kind == 'pattern':
+            self.pattern_commands[doc['name']] = command
+            if expression is not None:
+                self.patterns.add(
+                    doc['name'],
+                    expression,
+                    guilds=doc.get('guilds'),
+                    channels=doc.get('channels'))
+
+    def try_apply(self, kind, doc):
+        """apply a document, logging rather than raising if it's bad"""
+        try:
+            self.apply(kind, doc)
+        except Exception:
+            log.exception(f"couldn't apply spost.{kind} document "
+                          f"{doc.get('_id')}, skipping it")
+            return False
+        return True
+
+    def drop(self, kind, doc_id):
+        name = self._names[kind].pop(doc_id, None)
+        if name is None:
+            return
+        command = self._dynamic_commands.pop(name)
+        for taken in (command.name, *command.aliases):
+            if self._taken.get(taken) is command:
+                del self._taken[taken]
+        if self._live:
+            self._update_cog_commands()
+            self.bot.remove_command(name)
+        if kind == 'pattern':
+            self.pattern_commands.pop(name, None)
+            self.patterns.remove(name)
+
+    def _register(self, command):
+        command.instance = self
+        self._dynamic_commands[command.name] = command
+        self._taken.update(
+            (name, command) for name in (command.name, *command.aliases))
+        if self._live:
+            self._update_cog_commands()
+            command.cog = self
+            self.bot.add_command(command)
+
+    def _update_cog_commands(self):
+        # Only add_cog and unloading look at this, so while loading it
+        # only needs putting together once at the end.
+        self.__cog_commands__ = (
+            self._static_commands + tuple(self._dynamic_commands.values()))
+
+    async def dispatch_pattern(self, name, message):
+        """invoke a pattern command without reparsing the message
+
+        the same checks process_commands would make still apply: no
+        bots, and the bot's, cog's and command's own checks have to
+        pass. the cooldown bucket is the command's own, so it's shared
+        with anyone typing the command out by hand. a pattern that's
+        still cooling down gets dropped before we bother making a
+        Context, but only spends its cooldown once the checks pass"""
+        if message.author.bot:
+            return
+        command = self.pattern_commands.get(name)
+        if command is None or not command.enabled:
+            return
+        bucket = None
+        if command._buckets.valid:
+            bucket = command._buckets.get_bucket(message)
+            if _cooling_down(bucket):
+                return
+
+        ctx = commands.Context(
+            prefix=self.bot.command_prefix,
+            message=message,
+            bot=self.bot,
+            invoked_with=name,
+            command=command)
+        try:
+            if not (await self.bot.can_run(ctx)
+                    and await command.can_run(ctx)):
+                return
+        except commands.CheckFailure:
+            return
+        if bucket is not None and bucket.update_rate_limit():
+            return
+
+        self.bot.dispatch('command', ctx)
+        try:
+            await ctx.invoke(command)
+        except Exception as error:
+            self.bot.dispatch(
+                'command_error', ctx, commands.CommandInvokeError(error))
+        else:
+            self.bot.dispatch('command_completion', ctx)
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def slowpatterns(self, ctx, count: int = 10):
+        """who's been hogging the listener"""
+        slowest = sorted(
+            self.patterns.timings.items(),
+            key=lambda item: item[1][2],
+            reverse=True)[:count]
+        if not slowest:
+            await ctx.send("nothing's been timed yet")
+            return
+        await ctx.send('```{}```'.format('\n'.join(
+            f'{name}: {total / runs * 1000:.3f}ms avg, '
+            f'{worst * 1000:.3f}ms worst ({runs} runs)'
+            for name, (runs, total, worst) in slowest)))
+
     @commands.command()
     async def shrug(self, ctx):
         """are you dense?"""
@@ -101,7 +652,7 @@ class SPostCog(commands.Cog):
     # unethical, but I am too lazy to solve the problem in
     # a legitimate way.
 
-    def add_generic(self, doc):
+    def build_generic(self, doc):
         async def func(self, ctx):
             await ctx.send(random.choice(doc['urls']))
         func.__name__ = doc['name']
@@ -111,10 +662,9 @@ class SPostCog(commands.Cog):
             name=doc['name'],
             aliases=aliases if aliases else []
         )(func)
-        func.instance = self
-        self.__cog_commands__ += (func,)
+        return func
 
-    def add_embed(self, doc):
+    def build_embed(self, doc):
         async def func(self, ctx):
             embed = discord.Embed(
                 title=doc['title']
@@ -133,10 +683,23 @@ class SPostCog(commands.Cog):
             name=doc['name'],
             aliases=aliases if aliases else []
         )(func)
-        func.instance = self
-        self.__cog_commands__ += (func,)
+        return func
+
+    def build_pattern(self, doc):
+        """the command for a pattern, and the expression to index it
+        under, or None if it's not safe to scan for"""
+        if doc.get('distribute'):
+            doc['pattern'] = r'(_|\W)*'.join(c for c in doc['pattern'])
+        if doc.get('case_sensitive'):
+            expression = re.compile(doc['pattern'])
+        else:
+            expression = re.compile(doc['pattern'], re.IGNORECASE)
+        safe = not nested_quantifier(
+            sre_parse.parse(expression.pattern, expression.flags))
+        if not safe:
+            log.warning(f"pattern '{doc['name']}' nests unbounded "
+                        "quantifiers, it won't be triggered")
 
-    def add_pattern(self, doc):
         async def func(self, ctx):
             await ctx.send(random.choice(doc['messages']))
         func.__name__ = doc['name']
@@ -153,14 +716,37 @@ class SPostCog(commands.Cog):
             aliases=aliases if aliases else [],
             hidden=True
         )(func)
-        func.instance = self
-        self.__cog_commands__ += (func,)
+        return func, expression if safe else None
+
+
+def _cooling_down(bucket):
+    # update_rate_limit without spending a token.
+    tokens = bucket._tokens
+    if time.time() > bucket._window + bucket.per:
+        tokens = bucket.rate
+    return tokens == 0
+
+
+def _scan(matcher, text):
+    return find_wang(text), matcher.search(text)
+
+
+def _scan_worker(matcher, text):
+    # The matcher's a copy out here, so its timings have to be sent
+    # back along with what it found.
+    return _scan(matcher, text), matcher.timings
+
+
+def _kill(pool):
+    pool.terminate()
+    pool.join()
 
 
 async def create_cog(bot):
     cog = SPostCog(bot)
     await cog._init()
     bot.add_cog(cog)
+    cog.start_sync()
 
 
 def setup(bot):
@@ -1,27 +1,58 @@
 import asyncio
+import bisect
 import logging
+import re
 import struct
 import textwrap
 import urllib.parse
-from collections import deque
+from collections import OrderedDict, deque, namedtuple
 from datetime import datetime, timedelta
 
 import discord
 from discord.ext.commands import Cog, Context, command, group, is_owner
+from pymongo.errors import DuplicateKeyError, OperationFailure, PyMongoError
 
 from wetbot.bot import Wetbot
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
-GOON_SERVERS = {
-    'goon1': ('goon1.goonhub.com', 26100),
-    'goon2': ('goon2.goonhub.com', 26200),
-    'goon3': ('goon3.goonhub.com', 26300),
-    'goon4': ('goon4.goonhub.com', 26400),
-    'goon5': ('goon5.goonhub.com', 26500),
+# Polled servers by community, unless ss13.servers says otherwise.
+DEFAULT_SERVERS = {
+    'goon': {
+        'goon1': ['goon1.goonhub.com', 26100],
+        'goon2': ['goon2.goonhub.com', 26200],
+        'goon3': ['goon3.goonhub.com', 26300],
+        'goon4': ['goon4.goonhub.com', 26400],
+        'goon5': ['goon5.goonhub.com', 26500],
+    },
 }
 
+# The community !goon reports on.
+GOON_COMMUNITY = 'goon'
+
+# Seconds to wait on the slowest server, since they're all asked at once.
+GOON_DEADLINE = 12.0
+
+# Everything BYOND's ckey() throws away.
+NOT_CKEY = re.compile(r'[^a-z0-9]')
+
+# History is bucketed by hour, with a slot for every minute.
+HISTORY_SLOTS = 60
+HISTORY_ROWS = 12
+HISTORY_SPAN = re.compile(r'(?P<amount>\d+)(?P<unit>[hdw])')
+HISTORY_UNITS = {'h': 'hours', 'd': 'days', 'w': 'weeks'}
+# How long history buckets stick around before mongo clears them out.
+HISTORY_DAYS = 90
+
+# Discord's embed limits.
+EMBED_FIELDS = 25
+EMBED_CHARS = 6000
+FIELD_CHARS = 1024
+
+# A cached server status. params and admins are None when error is set.
+ServerStatus = namedtuple('ServerStatus', 'time params admins error')
+
 THE_GOON = """```
 {anger_text}
  __________
@@ -35,20 +66,302 @@ def goon_query(query):
     ) + b'\x00\x00\x00\x00\x00' + query.encode('ascii') + b'\x00'
 
 
+def parse_topic(packet):
+    if packet[0:2] != b'\x00\x83':
+        # Packet didn't start with expected bytes.
+        raise ValueError(packet)
+    length = struct.unpack('>H', packet[2:4])[0]
+    return urllib.parse.parse_qs(packet[5:length+3].decode('ascii'))
+
+
+def _int_param(params, key):
+    try:
+        return int(params[key][0])
+    except (KeyError, ValueError):
+        return None
+
+
+def _players(params):
+    return [
+        params['player' + str(x)][0]
+        for x
+        in range(
+            int(params['players'][0])
+        )
+    ]
+
+
+def width(text):
+    """length as Discord counts it, in UTF-16 code units"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def embed_width(embed):
+    """characters an embed counts against EMBED_CHARS"""
+    parts = [embed.title, embed.description,
+             embed.footer.text, embed.author.name]
+    for field in embed.fields:
+        parts += [field.name, field.value]
+    return sum(width(part) for part in parts if isinstance(part, str))
+
+
+def pack(entries, separator=', ', limit=FIELD_CHARS):
+    """join entries into as few values of at most limit as will fit"""
+    values = []
+    current = []
+    used = 0
+    for entry in entries:
+        size = width(entry)
+        if current:
+            size += width(separator)
+        if current and used + size > limit:
+            values.append(separator.join(current))
+            current = []
+            used = 0
+            size = width(entry)
+        current.append(entry)
+        used += size
+    if current:
+        values.append(separator.join(current))
+    return values
+
+
+def ckey(key):
+    """canonical form of a BYOND key, same as the game's ckey()"""
+    return NOT_CKEY.sub('', key.lower())
+
+
+class CkeyIndex(object):
+    """tracked ckeys and the alias graph between them
+
+    aliases are grouped under whichever canonical ckey the group was
+    first linked through, so every lookup is a dict hit or two no
+    matter how many people or aliases there are. the tracked keys are
+    also kept as entered, sorted case-insensitively, for listing"""
+
+    def __init__(self, ckeys=(), aliases=None):
+        # canonical ckey of every alias -> ckey of its group
+        self.canonical = {}
+        # group ckey -> every canonical ckey in the group
+        self.aliases = {}
+        # group ckey -> keys tracked through that group, as entered
+        self.tracked = {}
+        self.ckeys = []
+        self._sort_keys = []
+        for owner, others in (aliases or {}).items():
+            self.link(owner, *others)
+        for key in ckeys:
+            self.add(key)
+
+    def resolve(self, key):
+        key = ckey(key)
+        return self.canonical.get(key, key)
+
+    def link(self, owner, *others):
+        root = self.resolve(owner)
+        group = self.aliases.setdefault(root, {root})
+        self.canonical[root] = root
+        for other in others:
+            other_root = self.resolve(other)
+            if other_root == root:
+                continue
+            # Fold the other key's whole group into this one.
+            merged = self.aliases.pop(other_root, {other_root})
+            for alias in merged:
+                self.canonical[alias] = root
+            group |= merged
+            if other_root in self.tracked:
+                self.tracked.setdefault(root, set()).update(
+                    self.tracked.pop(other_root))
+
+    def __contains__(self, key):
+        return key in self.tracked.get(self.resolve(key), ())
+
+    def add(self, key):
+        if key in self:
+            return
+        self.tracked.setdefault(self.resolve(key), set()).add(key)
+        sort_key = key.lower()
+        i = bisect.bisect_right(self._sort_keys, sort_key)
+        self._sort_keys.insert(i, sort_key)
+        self.ckeys.insert(i, key)
+
+    def remove(self, key):
+        if key not in self:
+            return
+        root = self.resolve(key)
+        keys = self.tracked[root]
+        keys.discard(key)
+        if not keys:
+            del self.tracked[root]
+        sort_key = key.lower()
+        i = bisect.bisect_left(self._sort_keys, sort_key)
+        while self.ckeys[i] != key:
+            i += 1
+        del self._sort_keys[i]
+        del self.ckeys[i]
+
+    def admins(self, keys):
+        """the set of groups a server's admin list covers"""
+        admins = set()
+        for key in keys:
+            if ckey(key) not in self.canonical:
+                log.info('unaliased admin: ' + key)
+            admins.add(self.resolve(key))
+        return admins
+
+
+class TopicProtocol(asyncio.Protocol):
+    """frames BYOND topic responses out of a stream
+
+    responses come back in the order their queries went out, so
+    pipelined queries just wait in line for the next whole frame"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.transport = None
+        self.buffer = bytearray()
+        self.waiting = deque()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        self.transport = None
+        self._fail(exc or ConnectionResetError("topic connection closed"))
+
+    def _fail(self, exc):
+        while self.waiting:
+            future = self.waiting.popleft()
+            if not future.done():
+                future.set_exception(exc)
+
+    def data_received(self, data):
+        self.buffer += data
+        while len(self.buffer) >= 4:
+            if self.buffer[0:2] != b'\x00\x83':
+                # Lost track of the framing, nothing after this is
+                # trustworthy.
+                self._fail(ValueError(bytes(self.buffer)))
+                self.transport.close()
+                return
+            end = 4 + struct.unpack_from('>H', self.buffer, 2)[0]
+            if len(self.buffer) < end:
+                return
+            packet = bytes(self.buffer[:end])
+            del self.buffer[:end]
+            if self.waiting:
+                future = self.waiting.popleft()
+                if not future.done():
+                    future.set_result(packet)
+
+    def send(self, query):
+        future = self.loop.create_future()
+        self.waiting.append(future)
+        self.transport.write(goon_query(query))
+        return future
+
+
+class TopicClient(object):
+    """one kept-alive connection to a BYOND server, shared by queries"""
+
+    def __init__(self, loop, address, connect_timeout=5.0, timeout=3.0):
+        self.loop = loop
+        self.address = address
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self._protocol = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def connected(self):
+        return (self._protocol is not None
+                and self._protocol.transport is not None)
+
+    async def _connect(self):
+        async with self._lock:
+            if not self.connected:
+                _, self._protocol = await asyncio.wait_for(
+                    self.loop.create_connection(
+                        lambda: TopicProtocol(self.loop), *self.address),
+                    self.connect_timeout)
+            return self._protocol
+
+    async def query(self, *queries):
+        """send every query down the wire at once, return raw packets"""
+        for attempt in range(2):
+            reused = self.connected
+            protocol = await self._connect()
+            futures = [protocol.send(query) for query in queries]
+            try:
+                return await asyncio.wait_for(
+                    asyncio.gather(*futures), self.timeout)
+            except ConnectionError:
+                # The server may have hung up on an idle connection,
+                # which is worth one more try on a fresh one.
+                if not reused or attempt:
+                    raise
+            except asyncio.TimeoutError:
+                self.close()
+                raise
+
+    def close(self):
+        if self.connected:
+            self._protocol.transport.close()
+        self._protocol = None
+
+
 class SS13Cog(Cog):
     def __init__(self, bot: Wetbot):
         self.bot = bot
         self.db = bot.db.ss13
+        self.servers = OrderedDict(
+            (community, OrderedDict(
+                (name, tuple(address))
+                for name, address in servers.items()
+            ))
+            for community, servers in bot.config.get(
+                'ss13', 'servers', DEFAULT_SERVERS).items()
+        )
+        self.addresses = OrderedDict(
+            (name, address)
+            for servers in self.servers.values()
+            for name, address in servers.items()
+        )
+        self.community = {
+            name: community
+            for community, servers in self.servers.items()
+            for name in servers
+        }
+        self.status = {}
+        self.topic = {
+            name: TopicClient(bot.loop, address)
+            for name, address in self.addresses.items()
+        }
+        # canonical ckey -> servers they were on as of the last poll
+        self.whereabouts = {}
+        self._server_players = {}
+        self._refreshing = {}
+        self._polling_future = bot.loop.create_task(self.poll_servers())
+
+    def __unload(self):
+        self._polling_future.cancel()
+        for task in self._refreshing.values():
+            task.cancel()
+        for client in self.topic.values():
+            client.close()
 
     async def _init(self):
-        self.ckey_list = (await self.db.find_one(
-            {'name': 'ckey_list'}))['ckeys']
-        self.ckey_aliases = (await self.db.find_one(
-            {'name': 'ckey_aliases'}))['ckeys']
-
-        for i in range(len(self.ckey_list)):
-            if self.ckey_list[i] in self.ckey_aliases:
-                self.ckey_list += self.ckey_aliases[self.ckey_list[i]]
+        await self.db.history.create_index(
+            [('server', 1), ('hour', 1)], unique=True)
+        await self._expire_history(
+            self.bot.config.get('ss13', 'history_days', HISTORY_DAYS))
+        self.ckey_index = CkeyIndex(
+            (await self.db.find_one(
+                {'name': 'ckey_list'}))['ckeys'],
+            (await self.db.find_one(
+                {'name': 'ckey_aliases'}))['ckeys'],
+        )
 
     @group(invoke_without_command=True)
     @is_owner()
@@ -57,222 +370,412 @@ class SS13Cog(Cog):
 
         list all ckeys, or add and remove them with subcommands"""
 
-        ckey_list = sorted(
-            (await self.db.find_one(
-                {'name': 'ckey_list'}))['ckeys'],
-            key=lambda ckey: ckey.lower(),
-        )
-        await ctx.send(f'```{", ".join(ckey_list)}```')
+        await ctx.send(f'```{", ".join(self.ckey_index.ckeys)}```')
 
     @ckeys.command(name='add')
-    async def ckeys_add(self, ctx: Context, ckey: str):
+    async def ckeys_add(self, ctx: Context, key: str):
         """yes more people"""
 
-        ckey_list = sorted(
-            (await self.db.find_one_and_update(
+        if key not in self.ckey_index:
+            await self.db.update_one(
                 {'name': 'ckey_list'},
-                {'$addToSet': {'ckeys': ckey}},
-                return_document=True)
-             )['ckeys'],
-            key=lambda ckey: ckey.lower(),
-        )
+                {'$addToSet': {'ckeys': key}})
+            self.ckey_index.add(key)
 
-        await ctx.send(f'```{", ".join(ckey_list)}```')
+        await ctx.send(f'```{", ".join(self.ckey_index.ckeys)}```')
 
     @ckeys.command(name='remove')
-    async def ckeys_remove(self, ctx: Context, ckey: str):
+    async def ckeys_remove(self, ctx: Context, key: str):
         """no, less people"""
 
-        ckey_list = sorted(
-            (await self.db.find_one_and_update(
+        if key in self.ckey_index:
+            await self.db.update_one(
                 {'name': 'ckey_list'},
-                {'$pull': {'ckeys': ckey}},
-                return_document=True)
-             )['ckeys'],
-            key=lambda ckey: ckey.lower(),
-        )
-
-        await ctx.send(f'```{", ".join(ckey_list)}```')
-
-    @command()
-    async def goon(self, ctx: Context):
-        """something awful this way comes
-
-        retrieves server information for both goonstation servers. seeing one
-        or the other is not option. this is because we are trying to do just
-        a little to save the RP server"""
-
-        for name, address in GOON_SERVERS.items():
-            embed_title = f'{name} (byond://{address[0]}:{address[1]})'
+                {'$pull': {'ckeys': key}})
+            self.ckey_index.remove(key)
 
-            try:
-                # Retrieve status information and admin list.
-                reader, writer = await asyncio.wait_for(
-                    asyncio.open_connection(*address), 5.0)
-
-                writer.write(goon_query('?status'))
-                await asyncio.wait_for(writer.drain(), 3.0)
-                status_response = await asyncio.wait_for(
-                    reader.read(4096), 3.0)
-
-                writer.write(goon_query('?admins'))
-                await asyncio.wait_for(writer.drain(), 3.0)
-                admin_response = await asyncio.wait_for(
-                    reader.read(4096), 3.0)
-
-                if writer.can_write_eof():
-                    writer.write_eof()
-                writer.close()
-
-            except (ConnectionRefusedError, asyncio.TimeoutError):
-                # Conenction refused or unable to connect before timeout.
-                await ctx.send(embed=discord.Embed(
-                    title=embed_title + ' (offline)',
-                    color=discord.Color.red()))
-                continue
+        await ctx.send(f'```{", ".join(self.ckey_index.ckeys)}```')
 
-            time = datetime.now()
-
-            for packet in (status_response, admin_response):
-                if packet[0:2] != b'\x00\x83':
-                    # Packet didn't start with expected bytes.
-                    log.warning(
-                        f"Malformed packet from server {name}, "
-                        f"{address[0]}:{address[1]}.")
-                    log.debug(f"Packet contents: {packet}")
-                    await ctx.send(
-                        "Unknown error retrieving status information for "
-                        f"server {name} at {address[0]}:{address[1]}")
-                    return
-
-            # Get embed paramters.
-            status_len = struct.unpack('>H', status_response[2:4])[0]
-            params = urllib.parse.parse_qs(
-                status_response[5:status_len+3].decode('ascii')
-            )
+    async def refresh(self, name, address):
+        """query a server and cache whatever comes back"""
+        try:
+            # Retrieve status information and admin list.
+            status_response, admin_response = await self.topic[name].query(
+                '?status', '?admins')
 
-            # Get admin list.
-            admin_len = struct.unpack('>H', admin_response[2:4])[0]
+            # Get embed paramters and admin list.
+            params = parse_topic(status_response)
             admins = [
                 value[0]
                 for key, value
-                in urllib.parse.parse_qs(
-                    admin_response[5:admin_len+3].decode('ascii')
-                ).items()
+                in parse_topic(admin_response).items()
                 if key != 'admins'
             ]
-
-            for i in range(len(admins)):
-                if admins[i] in self.ckey_aliases:
-                    admins += self.ckey_aliases[admins[i]]
-                else:
-                    log.info('unaliased admin: ' + admins[i])
-
-            players = deque()
-            players_cur = []
-            total_chars = 0
-            for player in sorted(
-                    params['player' + str(x)][0]
-                    for x
-                    in range(
-                        int(params['players'][0])
-                    )
-            ):
-                if total_chars != 0:
-                    chars = 2
-                else:
-                    chars = 0
-
-                entry = player
-                chars += len(entry)
-
-                if player in self.ckey_list:
-                    entry = '\\\U0001f354' + entry
-                    chars += 4
-
-                if player in admins:
-                    entry = '\\\u2b50' + entry
-                    chars += 2
-
-                if total_chars + chars > 1024:
-                    players.append(', '.join(players_cur))
-                    players_cur = []
-                    total_chars = 0
-
-                total_chars += chars
-                players_cur.append(entry)
-
-            if players_cur:
-                players.append(', '.join(players_cur))
-
-            try:
-                shuttle = int(params['shuttle_time'][0])
-                shuttle = str(timedelta(
-                    seconds=abs(shuttle)
-                )) + (
-                    ' (station)'
-                    if shuttle < 0
-                    else (
-                        ' (in transit)'
-                        if shuttle not in (0, 60*6)
-                        else ''
-                    )
-                )
-            except ValueError:
-                shuttle = params['elapsed'][0]
-
+        except (OSError, asyncio.TimeoutError):
+            # Conenction refused or unable to connect before timeout.
+            status = ServerStatus(datetime.now(), None, None, 'offline')
+        except ValueError as error:
+            log.warning(
+                f"Malformed packet from server {name}, "
+                f"{address[0]}:{address[1]}.")
+            log.debug(f"Packet contents: {error}")
+            status = ServerStatus(datetime.now(), None, None, 'malformed')
+        else:
+            status = ServerStatus(datetime.now(), params, admins, None)
+
+        self.status[name] = status
+        self._locate(name, status)
+        return status
+
+    def _locate(self, name, status):
+        """point everyone on a server at it, and nobody who left"""
+        players = set()
+        if status.error is None:
             try:
-                elapsed = str(timedelta(seconds=int(params['elapsed'][0])))
-            except ValueError:
-                elapsed = params['elapsed'][0]
-
+                players = {ckey(player) for player in _players(status.params)}
+            except (KeyError, ValueError):
+                pass
+        old_players = self._server_players.get(name, set())
+        for player in old_players - players:
+            servers = self.whereabouts[player]
+            servers.discard(name)
+            if not servers:
+                del self.whereabouts[player]
+        for player in players - old_players:
+            self.whereabouts.setdefault(player, set()).add(name)
+        self._server_players[name] = players
+
+    def fetch(self, name, address):
+        """a task for the server's next status, shared by every caller"""
+        task = self._refreshing.get(name)
+        if task is None or task.done():
+            task = self._refreshing[name] = self.bot.loop.create_task(
+                self.refresh(name, address))
+        return task
+
+    async def _poll(self, limit, name, address):
+        async with limit:
+            return await self.fetch(name, address)
+
+    async def poll_servers(self):
+        # Only so many servers get asked at once. Commands never wait
+        # on this, they go straight to fetch.
+        limit = asyncio.Semaphore(
+            self.bot.config.get('ss13', 'poll_concurrency', 10))
+        while True:
+            statuses = await asyncio.gather(
+                *(self._poll(limit, name, address)
+                  for name, address in self.addresses.items()),
+                return_exceptions=True,
+            )
+            for name, status in zip(self.addresses, statuses):
+                if (isinstance(status, ServerStatus)
+                        and status.error is None):
+                    try:
+                        await self.record(name, status)
+                    except PyMongoError:
+                        log.exception(f"couldn't record history for {name}")
+            await asyncio.sleep(
+                self.bot.config.get('ss13', 'poll_interval', 60))
+
+    async def _expire_history(self, days):
+        """have mongo drop history buckets once they're days old"""
+        ttl = int(timedelta(days=days).total_seconds())
+        try:
+            await self.db.history.create_index(
+                'hour', expireAfterSeconds=ttl)
+        except OperationFailure:
+            # The index is already there with some other ttl.
+            await self.db.history.database.command(
+                'collMod', self.db.history.name,
+                index={'keyPattern': {'hour': 1}, 'expireAfterSeconds': ttl})
+
+    async def record(self, name, status):
+        """file a sample away in the server's bucket for this hour
+
+        buckets hold fixed-width arrays with a slot per minute, so a
+        month of history is a few hundred small documents per server
+        rather than tens of thousands of tiny ones"""
+        params = status.params
+        now = datetime.utcnow()
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        slot = now.minute
+        sample = {
+            'players': _int_param(params, 'players'),
+            'elapsed': _int_param(params, 'elapsed'),
+            'shuttle': _int_param(params, 'shuttle_time'),
+        }
+        mode = params['mode'][0] if params.get('mode') else None
+        map_name = params['map_name'][0] if params.get('map_name') else None
+
+        bucket = {'server': name, 'hour': hour}
+        update = {
+            '$set': {
+                f'{key}.{slot}': value
+                for key, value in sample.items()
+            },
+            '$addToSet': {'modes': mode, 'maps': map_name},
+        }
+        result = await self.db.history.update_one(bucket, update)
+        if result.matched_count:
+            return
+
+        # First sample of the hour. Setting an array index on a
+        # document that doesn't exist yet would make an object, so
+        # lay the arrays out up front.
+        doc = dict(bucket, modes=[mode], maps=[map_name])
+        for key, value in sample.items():
+            doc[key] = [None] * HISTORY_SLOTS
+            doc[key][slot] = value
+        try:
+            await self.db.history.insert_one(doc)
+        except DuplicateKeyError:
+            await self.db.history.update_one(bucket, update)
+
+    async def report(self, ctx: Context, refresh: bool = False):
+        # Anything missing or stale gets asked for all at once, then we
+        # report back in order. A dead server only holds up the ones
+        # listed after it, and never for longer than the deadline.
+        loop = self.bot.loop
+        deadline = loop.time() + GOON_DEADLINE
+        ttl = timedelta(seconds=self.bot.config.get('ss13', 'status_ttl', 120))
+        statuses = []
+        for name, address in self.servers.get(GOON_COMMUNITY, {}).items():
+            status = self.status.get(name)
+            if (refresh or status is None
+                    or datetime.now() - status.time > ttl):
+                status = self.fetch(name, address)
+            statuses.append((name, address, status))
+
+        for name, address, status in statuses:
+            if isinstance(status, asyncio.Future):
+                try:
+                    status = await asyncio.wait_for(
+                        asyncio.shield(status),
+                        max(0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    status = ServerStatus(
+                        datetime.now(), None, None, 'offline')
+            await self.send_status(ctx, name, address, status)
+
+    async def send_status(self, ctx: Context, name, address, status):
+        embed_title = f'{name} (byond://{address[0]}:{address[1]})'
+        time = status.time
+        age = 'as of {} ago'.format(
+            timedelta(seconds=int((datetime.now() - time).total_seconds())))
+
+        if status.error == 'offline':
             await ctx.send(embed=discord.Embed(
-                title=embed_title,
-                type='rich',
+                title=embed_title + ' (offline)',
                 timestamp=time,
-                color=discord.Color.green()
-            ).add_field(
-                name='Version',
-                value=params['version'][0]
-            ).add_field(
-                name='Mode',
-                value=params['mode'][0] + (
-                    ', respawn enabled'
-                    if params['respawn'][0] == '1'
+                color=discord.Color.red()
+            ).set_footer(text=age))
+            return
+        elif status.error:
+            await ctx.send(
+                "Unknown error retrieving status information for "
+                f"server {name} at {address[0]}:{address[1]}")
+            return
+
+        params = status.params
+        index = self.ckey_index
+        admins = index.admins(status.admins)
+
+        entries = []
+        for player in sorted(_players(params)):
+            entry = player
+            root = index.resolve(player)
+
+            if root in index.tracked:
+                entry = '\\\U0001f354' + entry
+
+            if root in admins:
+                entry = '\\\u2b50' + entry
+
+            entries.append(entry)
+
+        players = deque(pack(entries))
+
+        try:
+            shuttle = int(params['shuttle_time'][0])
+            shuttle = str(timedelta(
+                seconds=abs(shuttle)
+            )) + (
+                ' (station)'
+                if shuttle < 0
+                else (
+                    ' (in transit)'
+                    if shuttle not in (0, 60*6)
                     else ''
                 )
-            ).add_field(
-                name='Map Name',
-                value=params['map_name'][0]
-            ).add_field(
-                name='Round Length',
-                value=elapsed
-            ).add_field(
-                name='Shuttle Time',
-                value=shuttle
-            ).add_field(
-                name='Station Name',
-                value=(params['station_name'][0]
-                       if params.get('station_name')
-                       else 'N/A')
-            ).add_field(
-                name='Players ({})'.format(params['players'][0]),
-                value=players.popleft() if players else 'N/A',
-                inline=False
-            ))
+            )
+        except ValueError:
+            shuttle = params['elapsed'][0]
+
+        try:
+            elapsed = str(timedelta(seconds=int(params['elapsed'][0])))
+        except ValueError:
+            elapsed = params['elapsed'][0]
+
+        embed = discord.Embed(
+            title=embed_title,
+            type='rich',
+            timestamp=time,
+            color=discord.Color.green()
+        ).add_field(
+            name='Version',
+            value=params['version'][0]
+        ).add_field(
+            name='Mode',
+            value=params['mode'][0] + (
+                ', respawn enabled'
+                if params['respawn'][0] == '1'
+                else ''
+            )
+        ).add_field(
+            name='Map Name',
+            value=params['map_name'][0]
+        ).add_field(
+            name='Round Length',
+            value=elapsed
+        ).add_field(
+            name='Shuttle Time',
+            value=shuttle
+        ).add_field(
+            name='Station Name',
+            value=(params['station_name'][0]
+                   if params.get('station_name')
+                   else 'N/A')
+        ).add_field(
+            name='Players ({})'.format(params['players'][0]),
+            value=players.popleft() if players else 'N/A',
+            inline=False
+        ).set_footer(
+            text=age
+        )
 
-            if players:
-                for plist in players:
-                    await ctx.send(embed=discord.Embed(
-                        title=embed_title,
-                        type='rich',
-                        timestamp=time,
-                        color=discord.Color.green(),
-                    ).add_field(
-                        name='Players (cont.)',
-                        value=plist,
-                        inline=False,
-                    ))
+        # Fill every embed as far as Discord allows before sending it
+        # off, each message costs a round trip and a rate limit slot.
+        for plist in players:
+            if (len(embed.fields) >= EMBED_FIELDS
+                    or embed_width(embed) + width('Players (cont.)')
+                    + width(plist) > EMBED_CHARS):
+                await ctx.send(embed=embed)
+                embed = discord.Embed(
+                    title=embed_title,
+                    type='rich',
+                    timestamp=time,
+                    color=discord.Color.green(),
+                )
+            embed.add_field(
+                name='Players (cont.)',
+                value=plist,
+                inline=False,
+            )
+        await ctx.send(embed=embed)
+
+    @group(invoke_without_command=True)
+    async def goon(self, ctx: Context):
+        """something awful this way comes
+
+        retrieves server information for both goonstation servers. seeing one
+        or the other is not option. this is because we are trying to do just
+        a little to save the RP server
+
+        statuses are kept fresh in the background, so what you see may be
+        a minute or two old. use the refresh subcommand to ask right now"""
+        await self.report(ctx)
+
+    @goon.command(name='refresh')
+    async def goon_refresh(self, ctx: Context):
+        """i need to know NOW"""
+        await self.report(ctx, refresh=True)
+
+    @goon.command(name='history')
+    async def goon_history(self, ctx: Context, server: str, span: str = '1d'):
+        """what have i missed
+
+        shows the lowest, average and highest player counts over a span
+        of hours, days or weeks, e.g. ``12h``, ``3d`` or ``2w``"""
+
+        if server not in self.addresses:
+            await ctx.send(f"no server named `{server}`")
+            return
+        match = HISTORY_SPAN.fullmatch(span)
+        if not match:
+            await ctx.send("invalid timestring!")
+            return
+        span = timedelta(**{
+            HISTORY_UNITS[match.group('unit')]: int(match.group('amount'))
+        })
+        if span == timedelta(0):
+            await ctx.send("invalid timestring!")
+            return
+
+        now = datetime.utcnow()
+        start = now - span
+        window = span / HISTORY_ROWS
+        # Lowest, highest, total and count of samples for every row.
+        rows = [[None, None, 0, 0] for _ in range(HISTORY_ROWS)]
+
+        # Only the buckets overlapping the span, and only their counts.
+        async for bucket in self.db.history.find(
+                {'server': server,
+                 'hour': {'$gt': start - timedelta(hours=1), '$lte': now}},
+                {'hour': 1, 'players': 1}):
+            for minute, players in enumerate(bucket['players']):
+                time = bucket['hour'] + timedelta(minutes=minute)
+                if players is None or not start <= time <= now:
+                    continue
+                row = rows[min(int((time - start) / window),
+                               HISTORY_ROWS - 1)]
+                if row[3] == 0 or players < row[0]:
+                    row[0] = players
+                if row[3] == 0 or players > row[1]:
+                    row[1] = players
+                row[2] += players
+                row[3] += 1
+
+        if not any(row[3] for row in rows):
+            await ctx.send(f"no history for {server} in that span")
+            return
+
+        lines = [f'{server} players over the last {span} (UTC)',
+                 'from          min  avg  max']
+        for i, (lowest, highest, total, count) in enumerate(rows):
+            label = (start + window * i).strftime('%m-%d %H:%M')
+            if count:
+                lines.append(f'{label}  {lowest:>4} {total / count:>4.0f} '
+                             f'{highest:>4}')
+            else:
+                lines.append(f'{label}     -    -    -')
+        await ctx.send('```{}```'.format('\n'.join(lines)))
+
+    @command()
+    async def whereis(self, ctx: Context, key: str):
+        """where'd they go
+
+        looks up which servers a ckey (or any of their aliases) was on
+        as of the last poll"""
+
+        root = self.ckey_index.resolve(key)
+        servers = set()
+        for alias in self.ckey_index.aliases.get(root, {root}):
+            servers |= self.whereabouts.get(alias, set())
+
+        if not servers:
+            await ctx.send(f"haven't seen `{key}` anywhere")
+            return
+
+        now = datetime.now()
+        await ctx.send('\n'.join(
+            '`{}` is on {} ({}), as of {} ago'.format(
+                key, name, self.community[name],
+                timedelta(seconds=int(
+                    (now - self.status[name].time).total_seconds())))
+            for name in self.addresses
+            if name in servers
+        ))
 
     @command()
     async def goonsay(self, ctx: Context, *,
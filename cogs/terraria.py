@@ -2,8 +2,6 @@ import copy
 import logging
 import urllib.parse
 
-from aiohttp import ClientSession
-
 import discord
 from discord.ext import commands
 
@@ -14,7 +12,6 @@ log.setLevel(logging.DEBUG)
 class TerrariaCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.session = ClientSession(loop=bot.loop)
 
     @commands.group(aliases=('terr', 'terrararar'))
     async def terraria(self, ctx):
@@ -34,7 +31,7 @@ class TerrariaCog(commands.Cog):
             await ctx.send("configration incomplete")
             return
 
-        async with self.session.get(
+        async with self.bot.web.get(
             (f'http://{ip}:{port}/v2/server/status'
              f'?rules={"true" if rules else "false"}'
              f'&players=true&token={token}'),
@@ -82,7 +79,7 @@ class TerrariaCog(commands.Cog):
         token = self.bot.config.get('terraria', 'token', None)
         if command[0] != '/':
             command = '/' + command
-        async with self.session.get(
+        async with self.bot.web.get(
             (f'http://{ip}:{port}/v3/server/rawcmd'
              f'?token={token}&cmd={urllib.parse.quote(command)}'),
             timeout=10
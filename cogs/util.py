@@ -1,9 +1,15 @@
 import asyncio
+import heapq
 import logging
+import math
 import random
 import re
+import sys
+from collections import Counter, OrderedDict, deque, namedtuple
 from datetime import datetime, timedelta
+from functools import lru_cache
 
+from discord import HTTPException
 from discord.ext.commands import Cog, Context, command, clean_content
 
 from wetbot.bot import Wetbot
@@ -11,17 +17,15 @@ from wetbot.bot import Wetbot
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
-ROLL_CHECK = re.compile(
-    (r'(\b)'
-     r'(?P<roll>'
-     r'(?P<dice>\d*)d'
-     r'(?P<sides>\d+|%)'
-     r'(?P<sign>[+-])?(?P<modifier>\d*)'
-     r'(?:dc)?(?P<threshold>\d*)'
-     r')'
-     r'($|\s)'
-     ),
+# The pieces of a dice expression, matched one after another.
+DICE_TERM = re.compile(
+    r'(?P<dice>\d*)d(?P<sides>\d+|%)'
+    r'(?:(?P<cut>[kd])(?P<end>[hl]?)(?P<keep>\d+))?',
     re.IGNORECASE)
+# A modifier can't run into another dice term, that's arithmetic.
+DICE_NUMBER = re.compile(r'\d+')
+DICE_OPERATOR = re.compile(r'[+-]')
+DICE_THRESHOLD = re.compile(r'dc(?P<threshold>\d*)', re.IGNORECASE)
 
 TIME_FORMAT = re.compile(
     r'('
@@ -34,24 +38,405 @@ TIME_FORMAT = re.compile(
 
 POLL_PERIOD = 3600
 
+# How far ahead of now each poll loads reminders into memory. A bit
+# more than POLL_PERIOD, so nothing slips through between polls.
+REMINDER_WINDOW = POLL_PERIOD * 2
+
+# Seconds between messages when catching up on missed reminders.
+CATCH_UP_INTERVAL = 1.5
+
+MESSAGE_LIMIT = 2000
+
+# The furthest out a reminder can be set.
+REMINDER_LIMIT = timedelta(days=366)
+
+
+def _now():
+    # Reminder timestamps are stored as utcnow().timestamp(), so the
+    # current time has to be measured the same way.
+    return datetime.utcnow().timestamp()
+
+
+# Rolls of up to this many dice list every die in the reply.
+LISTED_DICE = 100
+
+# Up to this many dice get rolled one at a time. Bigger pools only
+# draw how many dice landed on each face.
+EXACT_DICE = 10000
+
+# Big pools of dice with more sides than this have too many faces to
+# count, so only their total and successes get drawn.
+COUNTED_SIDES = 1000
+
+# Past this many dice, or big pools with this many sides, rolls are
+# too much even to approximate with floats.
+APPROXIMATE_DICE = 2 ** 256
+APPROXIMATE_SIDES = 2 ** 256
+
+# Big pools of dice with up to this many sides show how many dice
+# landed on each face.
+HISTOGRAM_SIDES = 20
+
+# Compiled roll plans kept around for the next time someone rolls
+# the same thing.
+ROLL_CACHE_SIZE = 512
+
+# keep is how many of the dice count towards the total (None for all
+# of them), lowest is whether those are the lowest dice or the highest.
+Dice = namedtuple('Dice', 'count sides modifier keep lowest')
+DiceResult = namedtuple('DiceResult', 'total successes rolls faces dropped')
+# terms is a tuple of (sign, Dice or int) pairs to add up.
+RollPlan = namedtuple('RollPlan', 'text terms threshold')
+
+
+def _dice_term(match):
+    # Number of dice is optional, assume 1.
+    count = int(match.group('dice')) if match.group('dice') else 1
+    # Special syntax % for 100-sided die.
+    if match.group('sides') == '%':
+        sides = 100
+    else:
+        sides = int(match.group('sides'))
+    if not sides:
+        return None
+
+    keep, lowest = None, False
+    if match.group('cut'):
+        cut = int(match.group('keep'))
+        # kh/kl keep that many, dh/dl drop that many and keep the rest.
+        if match.group('cut').lower() == 'k':
+            keep = min(cut, count)
+            lowest = match.group('end').lower() == 'l'
+        else:
+            keep = max(count - cut, 0)
+            lowest = match.group('end').lower() == 'h'
+        if count > EXACT_DICE and sides > COUNTED_SIDES:
+            # There's no telling which of these dice were highest.
+            return None
+    if count > APPROXIMATE_DICE or (
+            count > EXACT_DICE and sides > APPROXIMATE_SIDES):
+        # Far too big to approximate with floats.
+        return None
+
+    return Dice(count, sides, 0, keep, lowest)
+
+
+@lru_cache(maxsize=ROLL_CACHE_SIZE)
+def compile_roll(text):
+    """turn a dice expression into a RollPlan, or None if it's not one
+
+    each piece of the expression gets matched exactly once, left to
+    right, and the finished plan is cached by its text"""
+    terms = []
+    pos = 0
+    sign = 1
+    while True:
+        match = DICE_TERM.match(text, pos)
+        if match is not None:
+            term = _dice_term(match)
+            if term is None:
+                return None
+        else:
+            match = DICE_NUMBER.match(text, pos)
+            if match is None:
+                if terms:
+                    # A sign with nothing after it, like d20+, adds
+                    # nothing.
+                    break
+                return None
+            term = int(match.group())
+        pos = match.end()
+        terms.append((sign, term))
+
+        match = DICE_OPERATOR.match(text, pos)
+        if match is None:
+            break
+        sign = -1 if match.group() == '-' else 1
+        pos = match.end()
+
+    if (len(terms) == 2 and isinstance(terms[0][1], Dice)
+            and isinstance(terms[1][1], int)):
+        # A lone number straight after lone dice gets added to each die.
+        (_, dice), (sign, modifier) = terms
+        terms = [(1, dice._replace(modifier=sign * modifier))]
+
+    threshold = None
+    match = DICE_THRESHOLD.match(text, pos)
+    if match is not None:
+        if match.group('threshold'):
+            threshold = int(match.group('threshold'))
+        pos = match.end()
+
+    if pos != len(text):
+        return None
+    if not any(isinstance(term, Dice) for _, term in terms):
+        # Just some numbers, nothing to roll.
+        return None
+    return RollPlan(text, tuple(terms), threshold)
+
+
+def _poisson(mean):
+    limit = math.exp(-mean)
+    count = 0
+    product = random.random()
+    while product > limit:
+        count += 1
+        product *= random.random()
+    return count
+
+
+def _binomial(n, p):
+    """successes out of n tries at odds p, in constant time
+
+    small n are tried out for real, big ones are approximated"""
+    if n <= 64:
+        return sum(random.random() < p for _ in range(n))
+    mean = n * p
+    if mean < 16:
+        return min(n, _poisson(mean))
+    if n - mean < 16:
+        return n - min(n, _poisson(n - mean))
+    draw = round(random.gauss(mean, math.sqrt(mean * (1 - p))))
+    return min(n, max(0, draw))
+
+
+def roll_faces(count, sides):
+    """how many of count dice land on each face, without rolling any"""
+    faces = {}
+    for face in range(1, sides + 1):
+        if not count:
+            break
+        # Whatever's left over is split evenly between the faces we
+        # haven't gotten to yet.
+        landed = _binomial(count, 1 / (sides - face + 1))
+        if landed:
+            faces[face] = landed
+            count -= landed
+    return faces
+
+
+def _keep_faces(faces, keep, lowest):
+    kept = {}
+    for face in sorted(faces, reverse=not lowest):
+        if not keep:
+            break
+        kept[face] = min(faces[face], keep)
+        keep -= kept[face]
+    return kept
+
+
+def roll_dice(dice, threshold=None):
+    """roll a whole pool of dice, taking shortcuts for the big ones"""
+    count, sides, modifier, keep, lowest = dice
+
+    if count <= EXACT_DICE:
+        if sides < sys.maxsize:
+            rolls = random.choices(
+                range(1 + modifier, sides + 1 + modifier), k=count)
+        else:
+            # Too many sides for a range to hold.
+            rolls = [random.randrange(sides) + 1 + modifier
+                     for _ in range(count)]
+        kept, dropped = rolls, None
+        if keep is not None and keep < count:
+            ordered = sorted(rolls, reverse=not lowest)
+            kept, dropped = ordered[:keep], Counter(ordered[keep:])
+        if threshold is None:
+            successes = None
+        else:
+            successes = sum(roll >= threshold for roll in kept)
+        return DiceResult(sum(kept), successes, rolls, None, dropped)
+
+    if sides <= COUNTED_SIDES:
+        faces = roll_faces(count, sides)
+        kept = faces
+        if keep is not None and keep < count:
+            kept = _keep_faces(faces, keep, lowest)
+        total = sum((face + modifier) * landed
+                    for face, landed in kept.items())
+        if threshold is None:
+            successes = None
+        else:
+            successes = sum(landed for face, landed in kept.items()
+                            if face + modifier >= threshold)
+        return DiceResult(total, successes, None, faces, None)
+
+    # This many dice add up to something that's as good as normal.
+    mean = count * (sides + 1) / 2
+    spread = math.sqrt(count * (sides * sides - 1) / 12)
+    total = min(count * sides, max(count, round(random.gauss(mean, spread))))
+    total += count * modifier
+    if threshold is None:
+        successes = None
+    else:
+        winners = sides - max(threshold - modifier, 1) + 1
+        successes = _binomial(count, min(sides, max(0, winners)) / sides)
+    return DiceResult(total, successes, None, None, None)
+
+
+def _mark(threshold, roll):
+    # If a threshold exists, chuck in some Unicode.
+    if threshold is None:
+        return ''
+    return '**\u2713**' if threshold <= roll else '\u2718'
+
+
+def _list_rolls(result, threshold=None):
+    # Dropped dice get struck out rather than left out.
+    dropped = Counter(result.dropped or ())
+    listed = []
+    for roll in result.rolls:
+        if dropped[roll]:
+            dropped[roll] -= 1
+            listed.append(f'~~{roll}~~')
+        else:
+            listed.append(str(roll) + _mark(threshold, roll))
+    return ', '.join(listed)
+
+
+def describe_roll(dice, result, threshold=None):
+    """whatever goes after the sum of a single pool of dice"""
+    if result.rolls is not None and len(result.rolls) <= LISTED_DICE:
+        if len(result.rolls) > 1:
+            # We've got more than one roll, the suffix appended to the
+            # sum will be a list of the individual rolls.
+            return f' ({_list_rolls(result, threshold)})'
+        # We have only one roll, the sum is sufficient to represent the
+        # dice rolled.
+        return _mark(threshold, result.total)
+
+    # Too many dice to list, so sum them up by face instead.
+    end = ''
+    if dice.sides <= HISTOGRAM_SIDES:
+        faces = result.faces
+        if faces is None:
+            faces = Counter(roll - dice.modifier for roll in result.rolls)
+        end += ' ({})'.format(', '.join(
+            f'{faces[face]}\u00d7{face + dice.modifier}'
+            for face in range(1, dice.sides + 1) if faces.get(face)))
+    if result.successes is not None:
+        counted = dice.count if dice.keep is None else dice.keep
+        end += ' {}**\u2713** {}\u2718'.format(
+            result.successes, counted - result.successes)
+    return end
+
+
+def roll_plan(plan):
+    """roll everything in a plan, giving the total and what goes after it"""
+    (sign, term), *rest = plan.terms
+    if not rest and sign > 0:
+        # A lone pool of dice gets its threshold checked die by die.
+        result = roll_dice(term, plan.threshold)
+        return result.total, describe_roll(term, result, plan.threshold)
+
+    total = 0
+    parts = []
+    for sign, term in plan.terms:
+        if isinstance(term, Dice):
+            result = roll_dice(term)
+            value = result.total
+            if (result.rolls is not None
+                    and len(result.rolls) <= LISTED_DICE):
+                part = _list_rolls(result)
+            else:
+                part = str(value)
+        else:
+            value = term
+            part = str(term)
+        total += sign * value
+        if parts or sign < 0:
+            parts.append('-' if sign < 0 else '+')
+        parts.append(part)
+    return total, ' ({}){}'.format(' '.join(parts),
+                                   _mark(plan.threshold, total))
+
+
+class ReminderScheduler(object):
+    """every upcoming reminder on one min-heap, behind a single timer
+
+    cancelled reminders stay in the heap and get skipped once they
+    reach the top, so cancelling never has to search for them"""
+
+    def __init__(self, loop, callback):
+        self.loop = loop
+        self.callback = callback
+        self._heap = []
+        self._pending = {}
+        self._timer = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __contains__(self, reminder_id):
+        return reminder_id in self._pending
+
+    def schedule(self, doc):
+        """queue up a reminder doc, unless it's already queued"""
+        if doc['_id'] in self._pending:
+            return False
+        self._pending[doc['_id']] = doc
+        heapq.heappush(self._heap, (doc['timestamp'], doc['_id']))
+        if self._heap[0][1] == doc['_id']:
+            self._arm()
+        return True
+
+    def cancel(self, reminder_id):
+        if self._pending.pop(reminder_id, None) is None:
+            return False
+        if self._heap[0][1] == reminder_id:
+            self._arm()
+        return True
+
+    def clear(self):
+        self._pending.clear()
+        self._heap.clear()
+        self._arm()
+
+    def _arm(self):
+        while self._heap and self._heap[0][1] not in self._pending:
+            heapq.heappop(self._heap)
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._heap:
+            self._timer = self.loop.call_later(
+                max(0, self._heap[0][0] - _now()), self._wake)
+
+    def _wake(self):
+        self._timer = None
+        now = _now()
+        while self._heap and self._heap[0][0] <= now:
+            _, reminder_id = heapq.heappop(self._heap)
+            doc = self._pending.pop(reminder_id, None)
+            if doc is not None:
+                self.callback(doc)
+        self._arm()
+
 
 class UtilCog(Cog):
     def __init__(self, bot: Wetbot):
         self.bot = bot
         self.db = bot.db.util
+        self.scheduler = ReminderScheduler(bot.loop, self._start_reminder)
         self._polling_future = bot.loop.create_task(self.poll_reminders())
-        self._reminders = []
+        # Reminders in the middle of being sent. They drop themselves
+        # out of here when they're done.
+        self._reminders = set()
+        # Every reminder due up to here has been loaded into memory.
+        self._horizon = None
 
     def __unload(self):
-        futures = asyncio.gather(
-            self._polling_future,
-            *self._reminders,
-            return_exceptions=True,
-        )
-        try:
-            futures.cancel()
-        except asyncio.CancelledError:
-            pass
+        log.info(f"cancelling {self.reminder_count} live reminders")
+        self.scheduler.clear()
+        self._polling_future.cancel()
+        for task in self._reminders:
+            task.cancel()
+        self._reminders.clear()
+
+    @property
+    def reminder_count(self):
+        """reminders loaded in memory, waiting or being sent"""
+        return len(self.scheduler) + len(self._reminders)
 
     @command(aliases=['c'])
     async def choose(self, ctx: Context, *, pipe_separated_choices: str):
@@ -77,125 +462,156 @@ class UtilCog(Cog):
         """roll dice for numbers
 
         Matches to the expression:
-        ``[die]d<sides>[+/-<modifier>][dc<threshold>]``
+        ``[die]d<sides>[k/d[h/l]<count>][+/-<modifier>][dc<threshold>]``
         Where...
         die       == number of die to roll  (1 if none)
         sides     == number of sides per die (100 if %)
+        count     == number of die to keep (kh/kl) or drop (dh/dl)
         modifier  == number to add to each result
         threshold == number required for roll to succeed
 
         Note that the only required elements are the 'd' and the number of
         sides. Everything else can be included or excluded at your leisure.
+        Dice and plain numbers can be added and subtracted, like
+        ``2d6+d4-1``, in which case every number just gets added to the
+        total and the threshold is checked on that.
+        Rolls with too many dice to list get counted up by face instead.
         """
 
-        dice_rolls = []
-        # Match valid expressions in expressions until we've got no more.
-        while ROLL_CHECK.match(expressions):
-            dice_roll, *expressions = expressions.split(maxsplit=1)
-            expressions = expressions[0] if expressions else ''
-            dice_rolls.append(ROLL_CHECK.match(dice_roll))
+        plans = []
+        # Compile each expression in turn until we hit one that isn't.
+        for match in re.finditer(r'\S+', expressions):
+            plan = compile_roll(match.group())
+            if plan is None:
+                expressions = expressions[match.start():]
+                break
+            plans.append(plan)
+        else:
+            expressions = ''
 
         # We begin our output with a mention to the calling user.
         output = ctx.author.mention
-        if not dice_rolls:  # No valid expressions.
+        if not plans:  # No valid expressions.
             await ctx.send(output + " I can't roll that doofus")
             return
 
         # Evaluate each dice roll expression.
-        for dice_roll in dice_rolls:
-            rolls = []
-
-            # Number of dice is optional, assume 1.
-            if dice_roll.group('dice'):
-                dice = int(dice_roll.group('dice'))
-            else:
-                dice = 1
-
-            # Special syntax % for 100-sided die.
-            if dice_roll.group('sides') == '%':
-                sides = 100
-            else:
-                sides = int(dice_roll.group('sides'))
-
-            # Do all the rolling.
-            for _ in range(dice):
-                num = random.randrange(sides) + 1
-
-                # Resolve modifiers for each roll.
-                if dice_roll.group('modifier'):
-                    modifier = int(dice_roll.group('modifier'))
-                    if dice_roll.group('sign') == '-':
-                        modifier *= -1
-                    num += modifier
-
-                rolls.append(num)
-
-            roll_sum = sum(rolls)
-            threshold = dice_roll.group('threshold')
-
-            if len(rolls) > 1:
-                # We've got more than one roll, the suffix appended to the
-                # sum will be a list of the individual rolls.
-
-                end = ' ({})'.format(', '.join(  # Join all the rolls.
-                    str(roll) + (
-                        # If a threshold exists, chuck in some Unicode.
-                        ('**\u2713**'
-                         if int(threshold) <= roll
-                         else '\u2718')
-                        if threshold else ''
-                    ) for roll in rolls
-                ))
-            else:
-                # We have only one roll, the sum is sufficient to represent
-                # the dice rolled.
-                if threshold:
-                    # If a threshold exists, chuck in some Unicode.
-                    end = ('**\u2713**'
-                           if int(threshold) <= roll_sum
-                           else '\u2718')
-                else:
-                    end = ''
-
-            # Extend our output with the results of this roll.
-            output += ' {roll} = {sum}{end}'.format(
-                roll=dice_roll.group('roll'),
-                sum=roll_sum,
-                end=end,
-            )
+        for plan in plans:
+            total, end = roll_plan(plan)
+            output += f' {plan.text} = {total}{end}'
 
         # Send across all the results, and anything in expressions that
         # wasn't matched as a dice roll.
-        await ctx.send('{output}{rest}'.format(
-            output=output,
-            rest=f' **{expressions}**' if expressions else ''
-        ))
-
-    async def schedule_reminder(self, reminder_doc):
-        date = datetime.fromtimestamp(reminder_doc['timestamp'])
-        diff = date - datetime.utcnow()
-        if diff <= timedelta(POLL_PERIOD):
-            async def reminder():
-                await asyncio.sleep(diff.total_seconds())
-                delete_result = await self.db.reminders.delete_one(
-                    {'_id': reminder_doc['_id']})
-                if delete_result.deleted_count == 0:
-                    return
-                channel = self.bot.get_channel(
-                    reminder_doc['channel_id'])
-                mention = self.bot.get_user(
-                    reminder_doc['user_id']).mention
-                text = reminder_doc['text']
-                await channel.send(
-                    f"{mention} {text}")
-            self._reminders.append(
-                self.bot.loop.create_task(reminder())
-            )
+        output += f' **{expressions}**' if expressions else ''
+        if len(output) > MESSAGE_LIMIT:
+            output = output[:MESSAGE_LIMIT - 1] + '\u2026'
+        await ctx.send(output)
+
+    def _start_reminder(self, reminder_doc):
+        task = self.bot.loop.create_task(self.send_reminder(reminder_doc))
+        self._reminders.add(task)
+        task.add_done_callback(self._reminders.discard)
+
+    def _reminder_line(self, reminder_doc):
+        user = self.bot.get_user(reminder_doc['user_id'])
+        if user is not None:
+            mention = user.mention
+        else:
+            # Not someone we can see anymore, but a raw mention still
+            # pings them if they're around.
+            mention = f"<@{reminder_doc['user_id']}>"
+        text = reminder_doc['text']
+        return f"{mention} {text}"[:MESSAGE_LIMIT]
+
+    async def send_reminder(self, reminder_doc):
+        delete_result = await self.db.reminders.delete_one(
+            {'_id': reminder_doc['_id']})
+        if delete_result.deleted_count == 0:
+            return
+        channel = self.bot.get_channel(
+            reminder_doc['channel_id'])
+        if channel is None:
+            log.info("dropping reminder for missing channel "
+                     f"{reminder_doc['channel_id']}")
+            return
+        await channel.send(self._reminder_line(reminder_doc))
+
+    async def catch_up(self, reminder_docs):
+        """deliver everything that came due while we were away
+
+        reminders get merged by channel into as few messages as they'll
+        fit in, and the messages go out one at a time at a steady pace
+        so a long outage doesn't end in a pile of 429s"""
+        by_channel = OrderedDict()
+        for doc in sorted(reminder_docs, key=lambda doc: doc['timestamp']):
+            by_channel.setdefault(doc['channel_id'], []).append(doc)
+
+        outbox = deque()
+        for channel_id, docs in by_channel.items():
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                log.info(f"dropping {len(docs)} reminders for missing "
+                         f"channel {channel_id}")
+                await self.db.reminders.delete_many(
+                    {'_id': {'$in': [doc['_id'] for doc in docs]}})
+                continue
+            lines, ids, size = [], [], 0
+            for doc in docs:
+                line = self._reminder_line(doc)
+                if lines and size + 1 + len(line) > MESSAGE_LIMIT:
+                    outbox.append((channel, lines, ids))
+                    lines, ids, size = [], [], 0
+                size += len(line) + (1 if lines else 0)
+                lines.append(line)
+                ids.append(doc['_id'])
+            outbox.append((channel, lines, ids))
+
+        log.info(f"catching up on {len(reminder_docs)} reminders "
+                 f"in {len(outbox)} messages")
+        while outbox:
+            channel, lines, ids = outbox.popleft()
+            delete_result = await self.db.reminders.delete_many(
+                {'_id': {'$in': ids}})
+            if delete_result.deleted_count:
+                try:
+                    await channel.send('\n'.join(lines))
+                except HTTPException:
+                    log.exception(f"couldn't catch up in {channel}")
+            if outbox:
+                await asyncio.sleep(CATCH_UP_INTERVAL)
+
+    def schedule_reminder(self, reminder_doc):
+        # Anything past the horizon gets paged in when the window
+        # slides up to it.
+        if (self._horizon is not None
+                and reminder_doc['timestamp'] <= self._horizon):
+            self.scheduler.schedule(reminder_doc)
 
     async def poll_reminders(self):
+        await self.db.reminders.create_index('timestamp')
+        # Channels and users can't be looked up until we're connected.
+        await self.bot.wait_until_ready()
         while True:
-            async for reminder in self.db.reminders.find():
-                await self.schedule_reminder(reminder)
+            # Slide the window forward, only reading in the reminders
+            # that have come into it since the last page. However many
+            # are waiting further out, they cost nothing here.
+            page = {'$lte': _now() + REMINDER_WINDOW}
+            if self._horizon is not None:
+                page['$gt'] = self._horizon
+            starting = self._horizon is None
+            self._horizon = page['$lte']
+            now = _now()
+            overdue = []
+            async for reminder in self.db.reminders.find(
+                    {'timestamp': page}):
+                if starting and reminder['timestamp'] <= now:
+                    overdue.append(reminder)
+                else:
+                    self.scheduler.schedule(reminder)
+            if overdue:
+                task = self.bot.loop.create_task(self.catch_up(overdue))
+                self._reminders.add(task)
+                task.add_done_callback(self._reminders.discard)
             await asyncio.sleep(POLL_PERIOD)
 
     @command()
@@ -208,9 +624,7 @@ class UtilCog(Cog):
         takes a time_delay in the format of
         ``[days]d[hours]h[minutes]m[seconds]``
 
-        still limited to 14 days because I don't wanna deal with
-        absolute loads of reminders for future dates clogging up
-        my database atm
+        reminders can be set up to a year out
         """
 
         delay = TIME_FORMAT.match(time_delay)
@@ -220,11 +634,14 @@ class UtilCog(Cog):
             in delay.groupdict(default=0).items()
         }
 
-        delta = timedelta(**delay_dict)
+        try:
+            delta = timedelta(**delay_dict)
+        except OverflowError:
+            delta = REMINDER_LIMIT + timedelta(1)
         if delta == timedelta(0):
             await ctx.send("invalid timestring!")
             return
-        if delta > timedelta(days=14):
+        if delta > REMINDER_LIMIT:
             await ctx.send("nnnnnnno")
             return
         remind_time = datetime.utcnow() + delta
@@ -239,7 +656,7 @@ class UtilCog(Cog):
         result = await self.db.reminders.insert_one(doc)
         doc['_id'] = result.inserted_id
 
-        await self.schedule_reminder(doc)
+        self.schedule_reminder(doc)
         await ctx.send(f"I'll remind you about that in {delta}")
 
 
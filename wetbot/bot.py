@@ -9,6 +9,8 @@ from discord.ext.commands.errors import MissingRequiredArgument
 
 from motor.motor_asyncio import AsyncIOMotorClient
 
+from wetbot.http import HTTPClient
+
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
@@ -29,6 +31,15 @@ class Wetbot(Bot):
                 'bot', 'owner_id', None),
             **options)
         self.pm_channel = None
+        # Not self.http, that one's discord's.
+        self._web = HTTPClient(
+            self.loop,
+            limit=config.get('http', 'limit', 100),
+            limit_per_host=config.get('http', 'limit_per_host', 10),
+            keepalive_timeout=config.get('http', 'keepalive_timeout', 30),
+            dns_ttl=config.get('http', 'dns_ttl', 300),
+            conn_timeout=config.get('http', 'conn_timeout', 5),
+            read_timeout=config.get('http', 'read_timeout', 10))
 
         cog_dir = Path('./cogs')
         cog_dir.mkdir(exist_ok=True)
@@ -47,6 +58,14 @@ class Wetbot(Bot):
     def db(self):
         return self._db
 
+    @property
+    def web(self):
+        return self._web
+
+    async def close(self):
+        await self._web.close()
+        await super().close()
+
     async def on_ready(self):
         log.info(
             "{}[{}] connected to discord 'cause she cares. "
@@ -0,0 +1,68 @@
+import logging
+import time
+import urllib.parse
+
+from aiohttp import ClientSession, TCPConnector
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+
+class TimedRequest(object):
+    """a request that notes how long the server took to answer"""
+
+    def __init__(self, client, host, request):
+        self._client = client
+        self._host = host
+        self._request = request
+
+    async def __aenter__(self):
+        start = time.perf_counter()
+        response = await self._request.__aenter__()
+        self._client.record(self._host, time.perf_counter() - start)
+        return response
+
+    async def __aexit__(self, *exc_info):
+        return await self._request.__aexit__(*exc_info)
+
+
+class HTTPClient(object):
+    """one pooled aiohttp session for every cog to share
+
+    connections get kept alive and dns lookups cached between requests,
+    and the time to each response gets tallied up by host"""
+
+    def __init__(self, loop, limit=100, limit_per_host=10,
+                 keepalive_timeout=30, dns_ttl=300,
+                 conn_timeout=5, read_timeout=10):
+        self.session = ClientSession(
+            loop=loop,
+            connector=TCPConnector(
+                loop=loop,
+                limit=limit,
+                limit_per_host=limit_per_host,
+                keepalive_timeout=keepalive_timeout,
+                use_dns_cache=True,
+                ttl_dns_cache=dns_ttl),
+            conn_timeout=conn_timeout,
+            read_timeout=read_timeout)
+        # host -> (requests, total seconds, worst seconds)
+        self.latency = {}
+
+    def record(self, host, elapsed):
+        requests, total, worst = self.latency.get(host, (0, 0.0, 0.0))
+        self.latency[host] = (
+            requests + 1, total + elapsed, max(worst, elapsed))
+
+    def request(self, method, url, **kwargs):
+        return TimedRequest(
+            self,
+            urllib.parse.urlsplit(url).hostname,
+            self.session.request(method, url, **kwargs))
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    async def close(self):
+        log.info("closing shared http session")
+        await self.session.close()